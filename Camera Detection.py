@@ -1,4 +1,4 @@
-""Raspberry Pi camera streaming with client-side (browser) MediaPipe object detection.
+"""Raspberry Pi camera streaming with client-side (browser) MediaPipe object detection.
 
 Architecture change (lightweight Pi):
   - Pi only captures frames (ffmpeg -> MJPEG) and pushes over a single WebSocket /ws/camera.
@@ -17,9 +17,13 @@ import subprocess
 import threading
 from typing import Optional, Set
 
-from flask import Flask, render_template_string
+from flask import Flask, Response, render_template, request
 from flask_sock import Sock
 
+from device_status import DeviceState, FAILED, IDLE, READY, health_report
+import metrics
+from metrics import CAMERA_FRAMES_IN, CAMERA_FRAMES_OUT, STREAM_CLIENTS
+
 app = Flask(__name__)
 sock = Sock(app)
 
@@ -27,9 +31,12 @@ sock = Sock(app)
 # Globals / State
 # -----------------------------
 RAW_CLIENTS: Set = set()
+STREAMING_CLIENTS: Set = set()  # clients whose ffmpeg has delivered frames
 CLIENTS_LOCK = threading.Lock()
 FRAME_THREAD: Optional[threading.Thread] = None
 STOP_EVENT = threading.Event()
+CAMERA_STATUS = DeviceState('camera', IDLE)  # ffmpeg only runs while streaming
+STREAM_CLIENTS.set_function(lambda: len(RAW_CLIENTS), stream='camera')
 
 
 
@@ -45,7 +52,11 @@ def camera_stream(ws):
         'pipe:1'
     ]
     process = subprocess.Popen(ffmpeg_cmd, stdout=subprocess.PIPE)
+    with CLIENTS_LOCK:
+        RAW_CLIENTS.add(ws)
+    metrics.profile_thread('camera')
 
+    frames = 0
     try:
         while True:
             data = b''
@@ -57,11 +68,33 @@ def camera_stream(ws):
                 if data[-2:] == b'\xff\xd9':  # JPEG frame end
                     break
             if data:
+                if not frames:
+                    with CLIENTS_LOCK:
+                        STREAMING_CLIENTS.add(ws)
+                frames += 1
+                if CAMERA_STATUS.state != READY:
+                    CAMERA_STATUS.set(READY, "streaming")
+                CAMERA_FRAMES_IN.inc()
                 ws.send(data)
+                CAMERA_FRAMES_OUT.inc()
             else:
+                # Pipe ended while the client is still connected. With v4l2,
+                # a second viewer's ffmpeg cannot open the device while the
+                # first is streaming, so only fail if nobody is getting frames.
+                with CLIENTS_LOCK:
+                    STREAMING_CLIENTS.discard(ws)
+                    if not STREAMING_CLIENTS:
+                        CAMERA_STATUS.set(FAILED, "ffmpeg stopped mid-stream" if frames
+                                          else "ffmpeg produced no frames")
                 break
     finally:
         process.terminate()
+        metrics.profile_thread_done()
+        with CLIENTS_LOCK:
+            RAW_CLIENTS.discard(ws)
+            STREAMING_CLIENTS.discard(ws)
+            if not RAW_CLIENTS and CAMERA_STATUS.state == READY:
+                CAMERA_STATUS.set(IDLE, "no viewers")
 
 
 # -----------------------------
@@ -69,142 +102,24 @@ def camera_stream(ws):
 # -----------------------------
 @app.route('/')
 def index():
-    return render_template_string(
-        """
-<!DOCTYPE html>
-<html>
-  <head>
-    <title>Camera Stream with Client-Side Detection</title>
-  <style>
-    body { font-family: Arial, sans-serif; }
-      .row { display: flex; gap: 30px; }
-      figure { text-align: center; }
-      img, canvas { border: 1px solid #444; }
-      #status { margin-top: 10px; font-size: 0.9rem; color: #555; }
-  </style>
-  </head>
-  <body>
-    <h2>Live Camera + Client-Side MediaPipe Object Detection</h2>
-  <div class="row">
-    <figure>
-    <img id="raw" width="320" height="240" alt="Raw stream" />
-    <figcaption>Raw</figcaption>
-    </figure>
-    <figure>
-        <canvas id="processed" width="320" height="240"></canvas>
-        <figcaption>Detected Objects (Browser)</figcaption>
-    </figure>
-  </div>
-  <p id="status">Connecting...</p>
-    <script type="module">
-      // Load MediaPipe Tasks for vision
-      import { FilesetResolver, ObjectDetector } from "https://cdn.jsdelivr.net/npm/@mediapipe/tasks-vision@0.10.3";
-
-      const statusEl = document.getElementById('status');
-      const rawImg = document.getElementById('raw');
-      const canvas = document.getElementById('processed');
-      const ctx = canvas.getContext('2d');
-
-      let detector = null;
-      let processing = false;
-      let lastFrameBlobUrl = null;
-
-      async function initDetector() {
-        try {
-          statusEl.textContent = 'Loading detector...';
-          const vision = await FilesetResolver.forVisionTasks(
-            'https://cdn.jsdelivr.net/npm/@mediapipe/tasks-vision@0.10.3/wasm'
-          );
-          detector = await ObjectDetector.createFromOptions(vision, {
-            baseOptions: {
-              modelAssetPath: 'https://storage.googleapis.com/mediapipe-models/object_detector/efficientdet_lite0/float16/1/efficientdet_lite0.tflite'
-            },
-            scoreThreshold: 0.45,
-            maxResults: 5
-          });
-          statusEl.textContent = 'Detector ready. Connecting stream...';
-          connectStream();
-        } catch (e) {
-          console.error(e);
-          statusEl.textContent = 'Failed to load detector; showing raw only.';
-          connectStream();
-        }
-      }
-
-      function connectStream() {
-        const proto = (location.protocol === 'https:') ? 'wss://' : 'ws://';
-        const ws = new WebSocket(proto + location.host + '/ws/camera');
-        ws.binaryType = 'arraybuffer';
-        ws.onopen = () => { statusEl.textContent = 'Streaming'; };
-        ws.onmessage = async (ev) => {
-          const blob = new Blob([ev.data], { type: 'image/jpeg' });
-          if (lastFrameBlobUrl) URL.revokeObjectURL(lastFrameBlobUrl);
-            const url = URL.createObjectURL(blob);
-          lastFrameBlobUrl = url;
-          rawImg.onload = () => {
-            if (!processing) {
-              requestAnimationFrame(runDetection);
-            }
-          };
-          rawImg.src = url;
-        };
-        ws.onclose = () => {
-          statusEl.textContent = 'Disconnected - retrying...';
-          setTimeout(connectStream, 1500);
-        };
-      }
-
-      async function runDetection() {
-        if (!detector || processing || rawImg.naturalWidth === 0) return;
-        processing = true;
-        try {
-          canvas.width = rawImg.naturalWidth;
-          canvas.height = rawImg.naturalHeight;
-          ctx.drawImage(rawImg, 0, 0, canvas.width, canvas.height);
-          const result = await detector.detect(rawImg);
-          if (result && result.detections) {
-            ctx.lineWidth = 2;
-            ctx.font = '14px Arial';
-            for (const det of result.detections) {
-              const bbox = det.boundingBox; // xMin, yMin, width, height
-              const x = bbox.originX;
-              const y = bbox.originY;
-              const w = bbox.width;
-              const h = bbox.height;
-              ctx.strokeStyle = '#00FF55';
-              ctx.fillStyle = 'rgba(0,255,85,0.15)';
-              ctx.strokeRect(x, y, w, h);
-              ctx.fillRect(x, y, w, h);
-              if (det.categories && det.categories.length) {
-                const cat = det.categories[0];
-                const label = `${cat.categoryName || 'obj'} ${(cat.score || 0).toFixed(2)}`;
-                const tw = ctx.measureText(label).width + 8;
-                const th = 18;
-                ctx.fillStyle = '#00FF55';
-                ctx.fillRect(x, y - th < 0 ? y : y - th, tw, th);
-                ctx.fillStyle = '#000';
-                ctx.fillText(label, x + 4, y - th/2 + 5 < 10 ? y + 14 : y - 4);
-              }
-            }
-          }
-        } catch (e) {
-          // Swallow any detection errors.
-        } finally {
-          processing = false;
-        }
-      }
-
-      initDetector();
-    </script>
-  </body>
-</html>
-    """
-  )
+    return render_template('camera.html')
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+  return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
+
+
+@app.route('/debug/profile')
+def debug_profile():
+  return Response(metrics.profile_report(request.args.get('reset') == '1'), mimetype='text/plain')
 
 
 @app.route('/health')
 def health():  # simple health check
-  return {"status": "ok", "raw_clients": len(RAW_CLIENTS)}
+  report = health_report(CAMERA_STATUS)
+  report["raw_clients"] = len(RAW_CLIENTS)
+  return report
  
 
 
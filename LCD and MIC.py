@@ -1,12 +1,19 @@
 #The LCD and MIC Code
 #!/usr/bin/env python3
 
-from flask import Flask, Response, render_template_string, request, redirect, url_for
+from flask import Flask, Response, jsonify, render_template, request, redirect, url_for
 import subprocess
 import threading
 import time
 import queue
 
+from audio_level import LevelMeter
+from device_status import DeviceState, FAILED, READY, STARTING, health_report
+from lcd_display import LCDWriter
+import metrics
+from metrics import (AUDIO_CHUNKS_IN, AUDIO_QUEUE_DEPTH, AUDIO_SILENT_CHUNKS, AUDIO_UNDERRUNS,
+                     STREAM_CLIENTS, STREAM_DROPS)
+
 # LCD imports
 try:
     from RPLCD.i2c import CharLCD
@@ -16,20 +23,22 @@ except ImportError:
     LCD_AVAILABLE = False
     print("⚠ LCD library not available")
 
-app = Flask(_name_)
+app = Flask(__name__)
+
+# LCD geometry (16x2 or 20x4)
+LCD_COLS = 16
+LCD_ROWS = 2
 
-# Initialize LCD
+# LCD; opened lazily on the LCDWriter thread, which also does all writes
 if LCD_AVAILABLE:
-    try:
-        lcd = CharLCD('PCF8574', 0x27)
-        lcd.clear()
-        lcd.write_string('Audio Server\nStarting...')
-        print("✅ LCD initialized")
-    except Exception as e:
-        print(f"❌ LCD initialization failed: {e}")
-        lcd = None
+    lcd_writer = LCDWriter(
+        cols=LCD_COLS, rows=LCD_ROWS,
+        opener=lambda: CharLCD('PCF8574', 0x27, cols=LCD_COLS, rows=LCD_ROWS))
+    lcd_status = lcd_writer.status
 else:
-    lcd = None
+    lcd_writer = None
+    lcd_status = DeviceState('lcd')
+    lcd_status.set(FAILED, 'LCD library not available')
 
 # Audio configuration
 SAMPLE_RATE = 44100
@@ -37,9 +46,18 @@ CHANNELS = 1
 DEVICE = 'plughw:0,0'  # Your mic is on card 0
 CHUNK_SIZE = 4096
 
+# Silence handling: clients asking for /audio?gate=1 get silent chunks
+# replaced by one shared, preallocated zero buffer, sent at a reduced rate.
+# Everyone else gets the microphone audio unchanged.
+SILENCE = bytes(CHUNK_SIZE)
+SILENCE_KEEPALIVE = 1.0  # seconds between silent chunks on gated streams
+
 # Global audio queue
 audio_queue = queue.Queue(maxsize=50)
 recording_process = None
+level_meter = LevelMeter(SAMPLE_RATE, CHANNELS)
+mic_status = DeviceState('mic')
+AUDIO_QUEUE_DEPTH.set_function(audio_queue.qsize)
 
 def audio_capture():
     """Capture audio using arecord"""
@@ -54,31 +72,43 @@ def audio_capture():
         '-t', 'raw'
     ]
     
+    metrics.profile_thread('audio-capture')
     try:
+        mic_status.set(STARTING)
         recording_process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        print(f"✅ Started audio capture from {DEVICE}")
-        
-        if lcd:
-            lcd.clear()
-            lcd.write_string('Audio Server\nStreaming...')
         
         while recording_process and recording_process.poll() is None:
             data = recording_process.stdout.read(CHUNK_SIZE)
             if data:
+                # The first chunk is the readiness check
+                if mic_status.state != READY:
+                    mic_status.set(READY, f"capturing from {DEVICE}")
+                    if lcd_writer:
+                        lcd_writer.show('Audio Server\nStreaming...')
+                AUDIO_CHUNKS_IN.inc()
+                voiced = level_meter.update(data)
+                if not voiced:
+                    AUDIO_SILENT_CHUNKS.inc()
                 try:
                     if audio_queue.full():
                         try:
                             audio_queue.get_nowait()
+                            STREAM_DROPS.inc(stream='audio')
                         except queue.Empty:
                             pass
-                    audio_queue.put(data, block=False)
+                    audio_queue.put((data, voiced), block=False)
                 except queue.Full:
                     pass
             else:
                 time.sleep(0.01)
                 
+        if mic_status.state != READY:
+            err = recording_process.stderr.read().decode(errors='replace').strip()
+            mic_status.set(FAILED, f"arecord exited: {err}")
+        else:
+            mic_status.set(FAILED, "arecord exited")
     except Exception as e:
-        print(f"❌ Error in audio capture: {e}")
+        mic_status.set(FAILED, f"Error in audio capture: {e}")
     finally:
         if recording_process:
             recording_process.terminate()
@@ -87,106 +117,14 @@ def audio_capture():
 def index():
     if request.method == 'POST':
         text = request.form.get('lcd_text', '')
-        if lcd and text:
-            lcd.clear()
-            # Handle text longer than 16 chars (split to 2 lines)
-            if len(text) <= 16:
-                lcd.write_string(text)
-            else:
-                line1 = text[:16]
-                line2 = text[16:32]
-                lcd.write_string(f"{line1}\n{line2}")
+        if lcd_writer and text:
+            # Text longer than one row wraps onto the next
+            lcd_writer.show(text)
             print(f"📺 LCD Display: {text}")
         return redirect(url_for('index'))
 
     # HTML page with audio player and LCD control
-    html = '''
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Live Audio Stream + LCD Control</title>
-        <meta name="viewport" content="width=device-width, initial-scale=1">
-        <style>
-            body { font-family: Arial; text-align: center; padding: 20px; background-color: #f0f0f0; }
-            .container { max-width: 600px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
-            .section { margin: 30px 0; padding: 20px; border: 2px solid #ddd; border-radius: 8px; }
-            .audio-section { border-color: #007bff; background: #f8f9ff; }
-            .lcd-section { border-color: #28a745; background: #f8fff8; }
-            audio { width: 100%; margin: 15px 0; }
-            button { background: #007bff; color: white; border: none; padding: 12px 20px; border-radius: 5px; cursor: pointer; margin: 5px; }
-            button:hover { background: #0056b3; }
-            .lcd-btn { background: #28a745; }
-            .lcd-btn:hover { background: #1e7e34; }
-            input[type="text"] { width: 100%; padding: 10px; margin: 10px 0; border: 2px solid #ddd; border-radius: 5px; font-size: 16px; box-sizing: border-box; }
-            .quick-btns { margin: 15px 0; }
-            .quick-btns button { background: #6c757d; font-size: 12px; padding: 8px 12px; margin: 3px; }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h1>🎤 Live Audio Stream + 📺 LCD Control</h1>
-            
-            <div class="section audio-section">
-                <h2>🔊 Live Audio Stream</h2>
-                <audio controls autoplay>
-                    <source src="/audio" type="audio/wav">
-                    Your browser does not support audio streaming.
-                </audio>
-                <p><small>Click play if audio doesn't start automatically</small></p>
-            </div>
-            
-            <div class="section lcd-section">
-                <h2>📺 LCD Display Control</h2>
-                
-                <form method="post">
-                    <input type="text" name="lcd_text" placeholder="Enter text for LCD (max 32 chars)" maxlength="32" required>
-                    <br>
-                    <button type="submit" class="lcd-btn">📺 Send to LCD</button>
-                </form>
-                
-                <div class="quick-btns">
-                    <p><strong>Quick Messages:</strong></p>
-                    <button onclick="sendQuick('Hello World!')">Hello World!</button>
-                    <button onclick="sendQuick('Welcome!')">Welcome!</button>
-                    <button onclick="sendQuick('Raspberry Pi Audio')">Pi Audio</button>
-                    <button onclick="sendQuick('System Ready')">System Ready</button>
-                    <button onclick="sendQuick('Listening...')">Listening...</button>
-                </div>
-                
-                <button onclick="clearLCD()" class="lcd-btn">🗑 Clear LCD</button>
-                <button onclick="showTime()" class="lcd-btn">🕐 Show Time</button>
-            </div>
-        </div>
-
-        <script>
-            function sendQuick(message) {
-                document.querySelector('input[name="lcd_text"]').value = message;
-                document.querySelector('form').submit();
-            }
-            
-            function clearLCD() {
-                fetch('/clear_lcd', {method: 'POST'})
-                    .then(() => location.reload());
-            }
-            
-            function showTime() {
-                fetch('/show_time', {method: 'POST'})
-                    .then(() => location.reload());
-            }
-            
-            // Auto-restart audio if it stops
-            const audio = document.querySelector('audio');
-            audio.addEventListener('ended', function() {
-                setTimeout(() => {
-                    audio.load();
-                    audio.play();
-                }, 1000);
-            });
-        </script>
-    </body>
-    </html>
-    '''
-    return render_template_string(html)
+    return render_template('audio_lcd.html')
 
 @app.route('/audio')
 def audio():
@@ -212,33 +150,72 @@ def audio():
         yield header
         
         # Stream audio data
-        while True:
-            try:
-                data = audio_queue.get(timeout=2.0)
+        STREAM_CLIENTS.inc(stream='audio')
+        try:
+            last_sent = 0.0
+            while True:
+                try:
+                    data, voiced = audio_queue.get(timeout=2.0)
+                except queue.Empty:
+                    AUDIO_UNDERRUNS.inc()
+                    data, voiced = SILENCE, False
+                if gate and not voiced:
+                    now = time.time()
+                    if now - last_sent < SILENCE_KEEPALIVE:
+                        continue
+                    last_sent = now
+                    data = SILENCE
+                else:
+                    last_sent = time.time()
                 yield data
-            except queue.Empty:
-                yield b'\x00' * CHUNK_SIZE
+        finally:
+            STREAM_CLIENTS.dec(stream='audio')
 
+    gate = request.args.get('gate') == '1'
     return Response(generate_wav(), mimetype='audio/wav', headers={'Cache-Control': 'no-cache'})
 
+@app.route('/health')
+def health():
+    """Per-device state while hardware comes online"""
+    return jsonify(health_report(mic_status, lcd_status))
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus metrics"""
+    return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
+
+@app.route('/debug/profile')
+def debug_profile():
+    """Collapsed stacks from the sampling profiler (FIREBOT_PROFILE=1)"""
+    return Response(metrics.profile_report(request.args.get('reset') == '1'), mimetype='text/plain')
+
+@app.route('/level')
+def level():
+    """Live microphone level and voice activity"""
+    return jsonify(level_meter.snapshot())
+
+@app.route('/lcd_vu', methods=['POST'])
+def lcd_vu():
+    """Show the live microphone level as a VU meter on LCD"""
+    if lcd_writer:
+        lcd_writer.show_live(lambda: level_meter.vu_text(LCD_COLS), 0.1)
+        print("📺 LCD Display: VU meter")
+    return "OK"
+
 @app.route('/clear_lcd', methods=['POST'])
 def clear_lcd():
     """Clear LCD display"""
-    if lcd:
-        lcd.clear()
+    if lcd_writer:
+        lcd_writer.clear()
         print("📺 LCD cleared")
     return "OK"
 
 @app.route('/show_time', methods=['POST'])
 def show_time():
-    """Show current time on LCD"""
-    if lcd:
-        from datetime import datetime
-        now = datetime.now()
-        time_str = now.strftime("%H:%M:%S\n%d/%m/%Y")
-        lcd.clear()
-        lcd.write_string(time_str)
-        print(f"📺 LCD Display: {time_str}")
+    """Show a continuously updated clock on LCD"""
+    if lcd_writer:
+        lcd_writer.show_clock()
+        print("📺 LCD Display: clock")
     return "OK"
 
 def get_local_ip():
@@ -252,25 +229,14 @@ def get_local_ip():
     except:
         return "localhost"
 
-if _name_ == '_main_':
-    # Test microphone first
-    print("🎤 Testing microphone...")
-    test_cmd = ['arecord', '-D', DEVICE, '-c', str(CHANNELS), '-r', str(SAMPLE_RATE), '-f', 'S16_LE', '-d', '2', '/tmp/test.wav']
-    try:
-        result = subprocess.run(test_cmd, capture_output=True, text=True, timeout=10)
-        if result.returncode == 0:
-            print("✅ Microphone test PASSED")
-        else:
-            print(f"❌ Microphone test FAILED: {result.stderr}")
-            exit(1)
-    except Exception as e:
-        print(f"❌ Microphone test ERROR: {e}")
-        exit(1)
-    
-    # Start audio capture thread
+if __name__ == '__main__':
+    # Bring hardware up in the background while the server starts;
+    # progress is reported per device on /health
+    if lcd_writer:
+        lcd_writer.start()
+        lcd_writer.show('Audio Server\nStarting...')
     audio_thread = threading.Thread(target=audio_capture, daemon=True)
     audio_thread.start()
-    time.sleep(2)
     
     local_ip = get_local_ip()
     print("="*50)
@@ -0,0 +1,90 @@
+"""
+Audio level metering and voice activity detection (VAD) for raw S16_LE PCM.
+
+Each chunk is measured with vectorized NumPy (RMS + peak in dBFS). The
+voiced/silent decision uses hysteresis so the gate does not chatter:
+  - it opens as soon as the level rises above OPEN_DB,
+  - it only closes after the level stays below CLOSE_DB for HANGOVER seconds.
+"""
+
+import math
+import time
+
+import numpy as np
+
+FLOOR_DB = -90.0  # reported for digital silence
+OPEN_DB = -45.0
+CLOSE_DB = -52.0
+HANGOVER = 0.6    # seconds
+
+
+class LevelMeter:
+    def __init__(self, sample_rate, channels=1, open_db=OPEN_DB, close_db=CLOSE_DB, hangover=HANGOVER):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.open_db = open_db
+        self.close_db = close_db
+        self.hangover = hangover
+
+        # Live level (read by web handlers / LCD)
+        self.rms_db = FLOOR_DB
+        self.peak_db = FLOOR_DB
+        self.voiced = False
+        self.updated = 0.0
+
+        # Stats
+        self.voiced_chunks = 0
+        self.silent_chunks = 0
+
+        self._quiet_for = 0.0
+
+    def update(self, data):
+        """Measure one PCM chunk; returns True if it should be treated as voiced."""
+        samples = np.frombuffer(data, dtype='<i2', count=len(data) // 2)
+        if samples.size == 0:
+            return self.voiced
+
+        x = samples.astype(np.float32)
+        rms = math.sqrt(float(np.dot(x, x)) / x.size) / 32768.0
+        peak = float(np.max(np.abs(x))) / 32768.0
+        self.rms_db = 20.0 * math.log10(rms) if rms > 0 else FLOOR_DB
+        self.peak_db = 20.0 * math.log10(peak) if peak > 0 else FLOOR_DB
+        self.updated = time.time()
+
+        duration = samples.size / float(self.sample_rate * self.channels)
+        if self.rms_db >= self.open_db:
+            self.voiced = True
+            self._quiet_for = 0.0
+        elif self.rms_db < self.close_db:
+            self._quiet_for += duration
+            if self._quiet_for >= self.hangover:
+                self.voiced = False
+        else:
+            # Between thresholds: hold the current state
+            self._quiet_for = 0.0
+
+        if self.voiced:
+            self.voiced_chunks += 1
+        else:
+            self.silent_chunks += 1
+        return self.voiced
+
+    def snapshot(self):
+        """JSON-friendly view of the current level."""
+        return {
+            'rms_db': round(self.rms_db, 1),
+            'peak_db': round(self.peak_db, 1),
+            'voiced': self.voiced,
+            'updated': self.updated,
+            'voiced_chunks': self.voiced_chunks,
+            'silent_chunks': self.silent_chunks,
+        }
+
+    def vu_text(self, cols=16):
+        """Two-line VU display for a character LCD."""
+        label = 'VOICE' if self.voiced else 'quiet'
+        line1 = f"{self.rms_db:4.0f}dB {label}"
+        # Map FLOOR..0 dBFS onto the bar width, ignoring the bottom 30 dB
+        span = -FLOOR_DB - 30.0
+        filled = int(round(cols * min(1.0, max(0.0, (self.rms_db + span) / span))))
+        return f"{line1}\n{'#' * filled}"
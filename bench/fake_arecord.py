@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Stand-in for `arecord -f S16_LE -t raw`: writes PCM to stdout in real time.
+
+Audio comes from a WAV file (--wav, looped; must be 16-bit) or from a tone
+generator that alternates --tone-on seconds of tone with --tone-off seconds
+of near-silence, so the level meter / silence gate are exercised too. Any
+arecord arguments the server passes, other than -r and -c, are ignored.
+"""
+
+import argparse
+import math
+import struct
+import sys
+import time
+import wave
+
+CHUNK_FRAMES = 2048
+
+
+def tone_period(sample_rate, channels, freq, on, off):
+    """One on/off cycle of S16_LE PCM."""
+    samples = []
+    for n in range(int(sample_rate * on)):
+        samples.append(int(8000 * math.sin(2 * math.pi * freq * n / sample_rate)))
+    # Faint noise floor rather than digital zero
+    samples.extend(((n * 7919) % 7) - 3 for n in range(int(sample_rate * off)))
+    frames = [s for s in samples for _ in range(channels)]
+    return struct.pack(f'<{len(frames)}h', *frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--wav', help='16-bit WAV file to loop')
+    parser.add_argument('--freq', type=float, default=440.0)
+    parser.add_argument('--tone-on', type=float, default=2.0)
+    parser.add_argument('--tone-off', type=float, default=2.0)
+    parser.add_argument('-r', dest='rate', type=int, default=44100)
+    parser.add_argument('-c', dest='channels', type=int, default=1)
+    args, _ = parser.parse_known_args()
+
+    if args.wav:
+        with wave.open(args.wav, 'rb') as w:
+            if w.getsampwidth() != 2:
+                sys.exit("fake_arecord: WAV must be 16-bit")
+            args.rate, args.channels = w.getframerate(), w.getnchannels()
+            pcm = w.readframes(w.getnframes())
+    else:
+        pcm = tone_period(args.rate, args.channels, args.freq, args.tone_on, args.tone_off)
+
+    out = sys.stdout.buffer
+    chunk = CHUNK_FRAMES * 2 * args.channels
+    period = CHUNK_FRAMES / float(args.rate)
+    pos = 0
+    next_chunk = time.time()
+    try:
+        while True:
+            data = pcm[pos:pos + chunk]
+            pos += chunk
+            if len(data) < chunk:
+                pos = chunk - len(data)
+                data += pcm[:pos]
+            out.write(data)
+            out.flush()
+            next_chunk += period
+            delay = next_chunk - time.time()
+            if delay > 0:
+                time.sleep(delay)
+    except (BrokenPipeError, KeyboardInterrupt):
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Stand-in for `ffmpeg ... -f mjpeg pipe:1`: writes JPEG frames to stdout.
+
+Frames come from a recorded MJPEG file (--mjpeg, looped) or are generated
+with Pillow. Each frame gets a JPEG COM segment holding its send time, so
+benchmark clients can measure end-to-end frame latency. Any ffmpeg
+arguments the server passes are ignored.
+"""
+
+import argparse
+import io
+import struct
+import sys
+import time
+
+
+def split_jpegs(data):
+    """Split a concatenated MJPEG byte stream into frames."""
+    frames = []
+    pos = 0
+    while True:
+        start = data.find(b'\xff\xd8', pos)
+        if start < 0:
+            break
+        end = data.find(b'\xff\xd9', start + 2)
+        if end < 0:
+            break
+        frames.append(data[start:end + 2])
+        pos = end + 2
+    return frames
+
+
+def synthetic_frames(count, width, height):
+    from PIL import Image, ImageDraw
+
+    frames = []
+    for i in range(count):
+        img = Image.new('RGB', (width, height), (30, 30, 30))
+        draw = ImageDraw.Draw(img)
+        x = (i * width // count)
+        draw.rectangle([x, height // 3, x + width // 6, 2 * height // 3], fill=(0, 200, 80))
+        draw.text((8, 8), f"frame {i}", fill=(255, 255, 255))
+        buf = io.BytesIO()
+        img.save(buf, format='JPEG', quality=70)
+        frames.append(buf.getvalue())
+    return frames
+
+
+def stamp(frame):
+    """Insert a COM segment with the current time right after SOI."""
+    payload = b'ts=%.6f' % time.time()
+    return frame[:2] + b'\xff\xfe' + struct.pack('>H', len(payload) + 2) + payload + frame[2:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--mjpeg', help='recorded MJPEG file to loop')
+    parser.add_argument('--fps', type=float, default=25.0)
+    parser.add_argument('--size', default='320x240')
+    args, _ = parser.parse_known_args()
+
+    if args.mjpeg:
+        with open(args.mjpeg, 'rb') as f:
+            frames = split_jpegs(f.read())
+    else:
+        width, height = (int(v) for v in args.size.split('x'))
+        frames = synthetic_frames(30, width, height)
+    if not frames:
+        sys.exit("fake_ffmpeg: no JPEG frames in input")
+
+    out = sys.stdout.buffer
+    period = 1.0 / args.fps
+    next_frame = time.time()
+    i = 0
+    try:
+        while True:
+            out.write(stamp(frames[i % len(frames)]))
+            out.flush()
+            i += 1
+            next_frame += period
+            delay = next_frame - time.time()
+            if delay > 0:
+                time.sleep(delay)
+    except (BrokenPipeError, KeyboardInterrupt):
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Stand-in for an RPLidar A1 on /dev/ttyUSB0, backed by a pseudo-terminal.
+
+Answers the commands RPLidarSLAM sends (stop, reset, scan). After a scan
+request it sends the scan response descriptor, then streams 5-byte
+measurement nodes at the A1's real rate. The nodes come from a recorded
+byte stream (--replay, looped), or from a synthetic rectangular room.
+
+Run it alone to get a port to point a server at:
+    python bench/fake_lidar.py        # prints e.g. /dev/pts/3
+    LIDAR_PORT=/dev/pts/3 python real_web_slam.py
+"""
+
+import argparse
+import math
+import os
+import random
+import select
+import threading
+import time
+import tty
+
+CMD_STOP = 0x25
+CMD_RESET = 0x40
+CMD_SCAN = 0x20
+SCAN_DESCRIPTOR = b'\xA5\x5A\x05\x00\x00\x40\x81'
+BOOT_BANNER = b'RP LIDAR System.\r\nFirmware Ver 1.29 - rc9, HW Ver 7\r\nModel: 18\r\n'
+
+SAMPLES_PER_SECOND = 2000
+ROTATION_HZ = 5.5
+NODE_SIZE = 5
+
+
+def encode_node(angle, distance, start, quality=47):
+    """One RPLidar legacy scan node (angle in degrees, distance in mm)."""
+    angle_q6 = int(angle * 64) & 0x7FFF
+    distance_q2 = int(distance * 4) & 0xFFFF
+    return bytes((
+        (quality << 2) | (0b01 if start else 0b10),
+        ((angle_q6 << 1) | 1) & 0xFF,
+        angle_q6 >> 7,
+        distance_q2 & 0xFF,
+        distance_q2 >> 8,
+    ))
+
+
+def room_rotation(width=6000.0, depth=4000.0, noise=15.0):
+    """One rotation of nodes inside a width x depth mm room, sensor in the middle."""
+    count = int(SAMPLES_PER_SECOND / ROTATION_HZ)
+    nodes = []
+    for n in range(count):
+        angle = 360.0 * n / count
+        rad = math.radians(angle)
+        c, s = abs(math.cos(rad)), abs(math.sin(rad))
+        distance = min(width / 2 / c if c > 1e-6 else 1e9, depth / 2 / s if s > 1e-6 else 1e9)
+        nodes.append(encode_node(angle, distance + random.uniform(-noise, noise), start=(n == 0)))
+    return b''.join(nodes)
+
+
+class FakeLidar:
+    def __init__(self, replay=None):
+        if replay:
+            with open(replay, 'rb') as f:
+                self.stream = f.read()
+        else:
+            self.stream = b''.join(room_rotation() for _ in range(8))
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.master)
+        tty.setraw(self.slave)  # kept open so the master never sees EIO
+        os.set_blocking(self.master, False)
+        self.port = os.ttyname(self.slave)
+        self.scanning = False
+        self.running = False
+        self.thread = None
+        self.bytes_sent = 0
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name='fake-lidar', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1)
+        os.close(self.master)
+        os.close(self.slave)
+
+    def _handle(self, data):
+        i = 0
+        while i < len(data) - 1:
+            if data[i] != 0xA5:
+                i += 1
+                continue
+            cmd = data[i + 1]
+            if cmd == CMD_STOP:
+                self.scanning = False
+            elif cmd == CMD_RESET:
+                self.scanning = False
+                os.write(self.master, BOOT_BANNER)
+            elif cmd == CMD_SCAN:
+                os.write(self.master, SCAN_DESCRIPTOR)
+                self.scanning = True
+            i += 2
+
+    def _run(self):
+        period = 0.02
+        per_tick = int(SAMPLES_PER_SECOND * period) * NODE_SIZE
+        pos = 0
+        next_tick = time.time()
+        while self.running:
+            ready, _, _ = select.select([self.master], [], [], max(0.0, next_tick - time.time()))
+            if ready:
+                try:
+                    self._handle(os.read(self.master, 256))
+                except BlockingIOError:
+                    pass
+                except OSError:
+                    return
+                continue
+            next_tick += period
+            if not self.scanning:
+                continue
+            chunk = self.stream[pos:pos + per_tick]
+            pos += per_tick
+            if len(chunk) < per_tick:
+                pos = per_tick - len(chunk)
+                chunk += self.stream[:pos]
+            try:
+                self.bytes_sent += os.write(self.master, chunk)
+            except BlockingIOError:
+                pass  # nobody reading: drop, like a UART overrun
+            except OSError:
+                return
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--replay', help='recorded lidar byte stream (nodes after the descriptor)')
+    args = parser.parse_args()
+    lidar = FakeLidar(args.replay).start()
+    print(lidar.port, flush=True)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        lidar.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,533 @@
+#!/usr/bin/env python3
+"""
+Load test / benchmark for the camera, audio and SLAM servers on stand-in hardware.
+
+No /dev/video0, plughw:0,0 or /dev/ttyUSB0 needed:
+  - `ffmpeg` and `arecord` are replaced via PATH by bench/fake_ffmpeg.py and
+    bench/fake_arecord.py (recorded MJPEG / WAV, or generated frames / tone),
+  - the lidar is bench/fake_lidar.py on a pseudo-terminal (LIDAR_PORT).
+
+Then N simulated WebSocket camera clients, HTTP audio listeners and map
+pollers are run against the servers. Throughput, latency percentiles, CPU
+and memory are reported per subsystem as JSON.
+
+    python bench/run_bench.py                     # each standalone script in turn
+    python bench/run_bench.py --target gateway    # all subsystems in gateway.py at once
+    python bench/run_bench.py --camera-clients 20 --audio-clients 10 \\
+        --map-pollers 5 --duration 30 --out bench.json
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import shlex
+import signal
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from fake_lidar import FakeLidar
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+HOST = '127.0.0.1'
+
+SUBSYSTEMS = {
+    'camera': {'script': 'Camera Detection.py', 'port': 5002},
+    'audio': {'script': 'LCD and MIC.py', 'port': 5000},
+    'slam': {'script': 'real_web_slam.py', 'port': 5000},
+}
+GATEWAY = {'script': 'gateway.py', 'port': 5000}
+
+AUDIO_BYTES_PER_SECOND = 44100 * 2  # what arecord produces (mono S16_LE)
+
+
+def percentiles(values, scale=1000.0):
+    """p50/p90/p99/max of a list of seconds, in milliseconds."""
+    if not values:
+        return None
+    v = sorted(values)
+
+    def pct(p):
+        return round(v[min(len(v) - 1, int(round(p / 100.0 * (len(v) - 1))))] * scale, 2)
+
+    return {'p50': pct(50), 'p90': pct(90), 'p99': pct(99), 'max': round(v[-1] * scale, 2), 'count': len(v)}
+
+
+def count_errors(errors):
+    counts = {}
+    for e in errors:
+        counts[e] = counts.get(e, 0) + 1
+    return counts
+
+
+# -----------------------------
+# Stand-in hardware
+# -----------------------------
+def write_shims(directory, args):
+    """`ffmpeg` / `arecord` executables that exec the fake sources."""
+    camera = [sys.executable, os.path.join(BENCH_DIR, 'fake_ffmpeg.py'), '--fps', str(args.fps)]
+    if args.mjpeg:
+        camera += ['--mjpeg', os.path.abspath(args.mjpeg)]
+    audio = [sys.executable, os.path.join(BENCH_DIR, 'fake_arecord.py')]
+    if args.wav:
+        audio += ['--wav', os.path.abspath(args.wav)]
+
+    for name, argv in (('ffmpeg', camera), ('arecord', audio)):
+        path = os.path.join(directory, name)
+        with open(path, 'w') as f:
+            f.write('#!/bin/sh\nexec %s "$@"\n' % ' '.join(shlex.quote(a) for a in argv))
+        os.chmod(path, 0o755)
+
+
+# -----------------------------
+# Server process + resource sampling
+# -----------------------------
+class Server:
+    def __init__(self, script, port, env, log_dir):
+        self.script = script
+        self.port = port
+        self.log_path = os.path.join(log_dir, os.path.splitext(os.path.basename(script))[0].replace(' ', '_') + '.log')
+        self.log = open(self.log_path, 'wb')
+        self.process = subprocess.Popen(
+            [sys.executable, script], cwd=ROOT, env=env,
+            stdout=self.log, stderr=subprocess.STDOUT, start_new_session=True)
+
+    async def wait_ready(self, timeout):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                break
+            try:
+                status, _, body = await http_get('/health', self.port)
+                if status == 200:
+                    return json.loads(body)
+            except (OSError, ValueError):
+                pass
+            await asyncio.sleep(0.2)
+        raise RuntimeError(f"{self.script} did not come up; see {self.log_path}")
+
+    def stop(self):
+        try:
+            os.killpg(self.process.pid, signal.SIGTERM)
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            os.killpg(self.process.pid, signal.SIGKILL)
+            self.process.wait()
+        except ProcessLookupError:
+            pass
+        self.log.close()
+
+
+def _process_tree(root):
+    """pid -> (ppid, cpu_ticks, rss_kb, cmdline) for root and all descendants."""
+    procs = {}
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            with open(f'/proc/{name}/statm') as f:
+                rss_pages = int(f.read().split()[1])
+            with open(f'/proc/{name}/cmdline', 'rb') as f:
+                cmdline = f.read().replace(b'\0', b' ').decode(errors='replace')
+        except (OSError, IndexError):
+            continue
+        procs[int(name)] = (int(fields[1]), int(fields[11]) + int(fields[12]),
+                            rss_pages * os.sysconf('SC_PAGE_SIZE') // 1024, cmdline)
+    tree, frontier = {}, [root]
+    while frontier:
+        pid = frontier.pop()
+        if pid in procs and pid not in tree:
+            tree[pid] = procs[pid]
+            frontier.extend(p for p, info in procs.items() if info[0] == pid)
+    return tree
+
+
+class ResourceSampler:
+    """CPU and RSS of a server's process tree, split into server vs fake sources."""
+
+    def __init__(self, root_pid, interval=0.5):
+        self.root_pid = root_pid
+        self.interval = interval
+        self.ticks = {}  # pid -> (group, first_ticks, last_ticks)
+        self.rss_samples = {'server': [], 'fake_sources': []}
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.started = time.time()
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            rss = {'server': 0, 'fake_sources': 0}
+            for pid, (_, ticks, rss_kb, cmdline) in _process_tree(self.root_pid).items():
+                group = 'fake_sources' if os.path.join('bench', 'fake_') in cmdline else 'server'
+                first = self.ticks.get(pid, (group, ticks, ticks))[1]
+                self.ticks[pid] = (group, first, ticks)
+                rss[group] += rss_kb
+            for group, kb in rss.items():
+                self.rss_samples[group].append(kb)
+            if self.stop_event.wait(self.interval):
+                return
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+        elapsed = time.time() - self.started
+        hz = os.sysconf('SC_CLK_TCK')
+        report = {}
+        for group, samples in self.rss_samples.items():
+            cpu = sum(last - first for g, first, last in self.ticks.values() if g == group) / hz
+            report[group] = {
+                'cpu_seconds': round(cpu, 2),
+                'cpu_percent': round(100.0 * cpu / elapsed, 1),
+                'rss_peak_mb': round(max(samples, default=0) / 1024.0, 1),
+                'rss_mean_mb': round(sum(samples) / max(1, len(samples)) / 1024.0, 1),
+            }
+        return report
+
+
+# -----------------------------
+# HTTP / WebSocket clients
+# -----------------------------
+async def http_open(path, port):
+    reader, writer = await asyncio.open_connection(HOST, port)
+    writer.write(f"GET {path} HTTP/1.0\r\nHost: {HOST}:{port}\r\n\r\n".encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        key, _, value = line.decode('latin-1').partition(':')
+        headers[key.strip().lower()] = value.strip()
+    return status, headers, reader, writer
+
+
+async def http_body(reader, headers):
+    """Yield body pieces (plain, close-delimited or chunked)."""
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                return
+            yield await reader.readexactly(size)
+            await reader.readline()
+    else:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                return
+            yield data
+
+
+async def http_get(path, port):
+    status, headers, reader, writer = await http_open(path, port)
+    try:
+        body = b''.join([piece async for piece in http_body(reader, headers)])
+    finally:
+        writer.close()
+    return status, headers, body
+
+
+async def ws_connect(path, port):
+    reader, writer = await asyncio.open_connection(HOST, port)
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write((f"GET {path} HTTP/1.1\r\nHost: {HOST}:{port}\r\nUpgrade: websocket\r\n"
+                  f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+    await writer.drain()
+    response = await reader.readuntil(b'\r\n\r\n')
+    if b' 101 ' not in response.split(b'\r\n', 1)[0]:
+        raise ConnectionError(response.split(b'\r\n', 1)[0].decode(errors='replace'))
+    return reader, writer
+
+
+async def ws_message(reader):
+    """Next complete data message; raises ConnectionError on close."""
+    payload = b''
+    while True:
+        b0, b1 = await reader.readexactly(2)
+        length = b1 & 0x7F
+        if length == 126:
+            length = struct.unpack('>H', await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack('>Q', await reader.readexactly(8))[0]
+        mask = await reader.readexactly(4) if b1 & 0x80 else None
+        data = await reader.readexactly(length)
+        if mask:
+            data = bytes(c ^ mask[i % 4] for i, c in enumerate(data))
+        opcode = b0 & 0x0F
+        if opcode == 0x8:
+            raise ConnectionError('websocket closed by server')
+        if opcode in (0x9, 0xA):
+            continue
+        payload += data
+        if b0 & 0x80:
+            return payload
+
+
+def frame_timestamp(frame):
+    """Send time embedded by fake_ffmpeg in a JPEG COM segment."""
+    i = frame.find(b'\xff\xfe', 0, 64)
+    if i < 0:
+        return None
+    length = struct.unpack('>H', frame[i + 2:i + 4])[0]
+    payload = frame[i + 4:i + 2 + length]
+    return float(payload[3:]) if payload.startswith(b'ts=') else None
+
+
+async def camera_client(stats, port, deadline):
+    try:
+        reader, writer = await ws_connect('/ws/camera', port)
+    except (OSError, ConnectionError, asyncio.IncompleteReadError) as e:
+        stats['errors'].append(f"connect: {e}")
+        return
+    frames = 0
+    try:
+        while time.time() < deadline:
+            frame = await asyncio.wait_for(ws_message(reader), timeout=max(0.01, deadline - time.time()))
+            sent = frame_timestamp(frame)
+            if sent is not None:
+                stats['latency'].append(time.time() - sent)
+            frames += 1
+            stats['bytes'] += len(frame)
+    except asyncio.TimeoutError:
+        pass
+    except (OSError, ConnectionError, asyncio.IncompleteReadError) as e:
+        stats['errors'].append(str(e))
+    finally:
+        stats['frames'].append(frames)
+        writer.close()
+
+
+async def audio_listener(stats, port, deadline, gate):
+    start = time.perf_counter()
+    try:
+        status, headers, reader, writer = await http_open('/audio?gate=1' if gate else '/audio', port)
+    except (OSError, ValueError, IndexError) as e:
+        stats['errors'].append(f"connect: {e}")
+        return
+    received = 0
+    last = None
+    body = http_body(reader, headers)
+    try:
+        while time.time() < deadline:
+            piece = await asyncio.wait_for(body.__anext__(), timeout=max(0.01, deadline - time.time()))
+            now = time.perf_counter()
+            if last is None:
+                stats['ttfb'].append(now - start)
+            else:
+                stats['gaps'].append(now - last)
+            last = now
+            received += len(piece)
+    except (asyncio.TimeoutError, StopAsyncIteration):
+        pass
+    except (OSError, asyncio.IncompleteReadError) as e:
+        stats['errors'].append(str(e))
+    finally:
+        await body.aclose()
+        writer.close()
+        stats['rates'].append(received / max(1e-6, time.perf_counter() - start))
+
+
+async def map_poller(stats, port, deadline, interval):
+    while time.time() < deadline:
+        start = time.perf_counter()
+        try:
+            status, _, body = await http_get('/map_data', port)
+            stats['latency'].append(time.perf_counter() - start)
+            data = json.loads(body)
+            if status != 200 or 'error' in data:
+                stats['errors'].append(data.get('error', f"HTTP {status}"))
+            else:
+                stats['scans'].append((time.time(), data['scan_count']))
+        except (OSError, ValueError, IndexError, asyncio.IncompleteReadError) as e:
+            stats['errors'].append(str(e))
+        await asyncio.sleep(max(0.0, interval - (time.perf_counter() - start)))
+
+
+async def scrape_metrics(port):
+    """firebot_* samples from /metrics, without histogram buckets."""
+    try:
+        status, _, body = await http_get('/metrics', port)
+    except OSError:
+        return {}
+    samples = {}
+    for line in body.decode().splitlines():
+        if line.startswith('firebot_') and '_bucket' not in line:
+            name, _, value = line.rpartition(' ')
+            samples[name] = float(value)
+    return samples
+
+
+# -----------------------------
+# Runs
+# -----------------------------
+def client_tasks(subsystem, port, args, deadline, stats):
+    if subsystem == 'camera':
+        s = stats['camera'] = {'frames': [], 'bytes': 0, 'latency': [], 'errors': []}
+        return [camera_client(s, port, deadline) for _ in range(args.camera_clients)]
+    if subsystem == 'audio':
+        s = stats['audio'] = {'rates': [], 'ttfb': [], 'gaps': [], 'errors': []}
+        return [audio_listener(s, port, deadline, args.gate) for _ in range(args.audio_clients)]
+    s = stats['slam'] = {'latency': [], 'scans': [], 'errors': []}
+    return [map_poller(s, port, deadline, args.poll_interval) for _ in range(args.map_pollers)]
+
+
+def summarize(subsystem, s, duration):
+    if subsystem == 'camera':
+        frames = sum(s['frames'])
+        clients = max(1, len(s['frames']))
+        return {
+            'clients': len(s['frames']),
+            'frames': frames,
+            'fps_per_client': round(frames / clients / duration, 2),
+            'bytes_per_second': round(s['bytes'] / duration),
+            'latency_ms': percentiles(s['latency']),
+            'errors': count_errors(s['errors']),
+        }
+    if subsystem == 'audio':
+        rates = s['rates']
+        mean_rate = sum(rates) / max(1, len(rates))
+        return {
+            'listeners': len(rates),
+            'bytes_per_second_per_listener': round(mean_rate),
+            'realtime_ratio': round(mean_rate / AUDIO_BYTES_PER_SECOND, 3),
+            'ttfb_ms': percentiles(s['ttfb']),
+            'gap_ms': percentiles(s['gaps']),
+            'errors': count_errors(s['errors']),
+        }
+    scans = sorted(s['scans'])
+    scan_rate = None
+    if len(scans) >= 2 and scans[-1][0] > scans[0][0]:
+        scan_rate = round((scans[-1][1] - scans[0][1]) / (scans[-1][0] - scans[0][0]), 2)
+    return {
+        'requests': len(s['latency']),
+        'requests_per_second': round(len(s['latency']) / duration, 2),
+        'latency_ms': percentiles(s['latency']),
+        'scans_per_second': scan_rate,
+        'errors': count_errors(s['errors']),
+    }
+
+
+def wanted(args):
+    counts = {'camera': args.camera_clients, 'audio': args.audio_clients, 'slam': args.map_pollers}
+    return [name for name in SUBSYSTEMS if counts[name] > 0]
+
+
+async def run_load(server, subsystems, args):
+    """Run the clients for `subsystems` against one server; returns stats + resources."""
+    health = await server.wait_ready(args.startup_timeout)
+    await asyncio.sleep(args.warmup)
+    sampler = ResourceSampler(server.process.pid)
+    sampler.start()
+    deadline = time.time() + args.duration
+    stats = {}
+    tasks = []
+    for name in subsystems:
+        tasks += client_tasks(name, server.port, args, deadline, stats)
+    await asyncio.gather(*tasks)
+    resources = sampler.stop()
+    metrics = await scrape_metrics(server.port)
+    return health, stats, resources, metrics
+
+
+async def bench(args):
+    subsystems = wanted(args)
+    results = {
+        'target': args.target,
+        'duration_s': args.duration,
+        'config': {
+            'camera_clients': args.camera_clients, 'audio_clients': args.audio_clients,
+            'map_pollers': args.map_pollers, 'fps': args.fps, 'gate': args.gate,
+            'mjpeg': args.mjpeg, 'wav': args.wav, 'lidar_replay': args.lidar_replay,
+        },
+        'subsystems': {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix='firebot-bench-') as tmp:
+        write_shims(tmp, args)
+        lidar = FakeLidar(args.lidar_replay).start() if 'slam' in subsystems else None
+        env = dict(os.environ, PATH=tmp + os.pathsep + os.environ.get('PATH', ''), PYTHONUNBUFFERED='1')
+        if lidar:
+            env['LIDAR_PORT'] = lidar.port
+        log_dir = args.log_dir or tmp
+        os.makedirs(log_dir, exist_ok=True)
+
+        try:
+            if args.target == 'gateway':
+                server = Server(GATEWAY['script'], GATEWAY['port'], env, log_dir)
+                try:
+                    health, stats, resources, metrics = await run_load(server, subsystems, args)
+                finally:
+                    server.stop()
+                for name in subsystems:
+                    results['subsystems'][name] = summarize(name, stats[name], args.duration)
+                results['health'] = health
+                # One process serves everything, so CPU/RSS cannot be split per subsystem
+                results['resources_scope'] = 'process'
+                results['resources'] = resources
+                results['metrics'] = metrics
+            else:
+                results['resources_scope'] = 'subsystem'
+                for name in subsystems:
+                    spec = SUBSYSTEMS[name]
+                    server = Server(spec['script'], spec['port'], env, log_dir)
+                    try:
+                        health, stats, resources, metrics = await run_load(server, [name], args)
+                    finally:
+                        server.stop()
+                    summary = summarize(name, stats[name], args.duration)
+                    summary.update(health=health, resources=resources, metrics=metrics)
+                    results['subsystems'][name] = summary
+        finally:
+            if lidar:
+                results['lidar_bytes_sent'] = lidar.bytes_sent
+                lidar.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--target', choices=('scripts', 'gateway'), default='scripts',
+                        help='standalone scripts one at a time, or everything in gateway.py')
+    parser.add_argument('--duration', type=float, default=15.0, help='seconds of load per run')
+    parser.add_argument('--warmup', type=float, default=2.0, help='seconds between /health OK and load')
+    parser.add_argument('--startup-timeout', type=float, default=30.0)
+    parser.add_argument('--camera-clients', type=int, default=5)
+    parser.add_argument('--audio-clients', type=int, default=5)
+    parser.add_argument('--map-pollers', type=int, default=3)
+    parser.add_argument('--poll-interval', type=float, default=0.5, help='seconds, like the SLAM page')
+    parser.add_argument('--gate', action='store_true', help='listeners request /audio?gate=1')
+    parser.add_argument('--fps', type=float, default=25.0, help='fake camera frame rate')
+    parser.add_argument('--mjpeg', help='recorded MJPEG file for the fake camera')
+    parser.add_argument('--wav', help='16-bit WAV file for the fake microphone (default: tone)')
+    parser.add_argument('--lidar-replay', help='recorded lidar byte stream (default: synthetic room)')
+    parser.add_argument('--log-dir', help='keep server logs here')
+    parser.add_argument('--out', help='write JSON here instead of stdout')
+    args = parser.parse_args()
+
+    try:
+        results = asyncio.run(bench(args))
+    except RuntimeError as e:
+        sys.exit(f"❌ {e}")
+    text = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + '\n')
+        print(f"✅ Results written to {args.out}")
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
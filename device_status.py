@@ -0,0 +1,51 @@
+"""
+Per-device readiness state reported by /health while hardware comes online.
+
+States: pending -> starting -> ready | failed  (idle = not in use right now)
+"""
+
+import threading
+import time
+
+PENDING = 'pending'
+STARTING = 'starting'
+READY = 'ready'
+FAILED = 'failed'
+IDLE = 'idle'
+
+
+class DeviceState:
+    def __init__(self, name, state=PENDING):
+        self.name = name
+        self.state = state
+        self.detail = ''
+        self.since = time.time()
+        self.lock = threading.Lock()
+
+    def set(self, state, detail=''):
+        with self.lock:
+            if state != self.state:
+                self.since = time.time()
+            self.state = state
+            self.detail = detail
+        if state == FAILED:
+            print(f"❌ {self.name}: {detail}")
+        elif state == READY:
+            print(f"✅ {self.name} ready")
+
+    def as_dict(self):
+        with self.lock:
+            return {'state': self.state, 'detail': self.detail, 'since': self.since}
+
+
+def health_report(*devices):
+    """Overall /health payload for a set of DeviceStates."""
+    states = {d.name: d.as_dict() for d in devices}
+    values = [s['state'] for s in states.values()]
+    if any(v == FAILED for v in values):
+        status = 'degraded'
+    elif any(v in (PENDING, STARTING) for v in values):
+        status = 'starting'
+    else:
+        status = 'ok'
+    return {'status': status, 'devices': states}
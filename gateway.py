@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+"""
+Single asyncio gateway hosting the camera, audio + LCD and SLAM services.
+
+Replaces running `Camera Detection.py`, `LCD and MIC.py` and `real_web_slam.py`
+as three separate thread-per-connection Flask servers:
+  - One ASGI app (Quart + Hypercorn) on one port; each subsystem is a Blueprint.
+  - Hardware readers run once, as background tasks (ffmpeg / arecord pipes) or
+    threads (RPLidar serial), and publish into async fan-out queues.
+  - Every viewer is a coroutine waiting on its own small queue, so a slow or
+    idle client costs a few KB instead of a pinned OS thread.
+
+Pages:   /camera   /mic   /slam
+Serves:  http://<pi>:5000
+"""
+
+import asyncio
+import multiprocessing
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+from quart import Blueprint, Quart, Response, jsonify, redirect, render_template, request, url_for, websocket
+
+from audio_level import LevelMeter
+from device_status import DeviceState, FAILED, IDLE, READY, STARTING, health_report
+from lcd_display import LCDWriter
+import metrics
+from metrics import (AUDIO_CHUNKS_IN, AUDIO_QUEUE_DEPTH, AUDIO_SILENT_CHUNKS, AUDIO_UNDERRUNS,
+                     CAMERA_FRAMES_IN, CAMERA_FRAMES_OUT, SLAM_POINTS, SLAM_RENDER_SECONDS,
+                     SLAM_SCANS, STREAM_CLIENTS, STREAM_DROPS)
+from real_web_slam import RPLidarSLAM, SLAMProcess, render_map_png
+
+# LCD imports
+try:
+    from RPLCD.i2c import CharLCD
+    LCD_AVAILABLE = True
+except ImportError:
+    LCD_AVAILABLE = False
+
+PORT = 5000
+
+# Camera configuration
+CAMERA_CMD = [
+    'ffmpeg',
+    '-f', 'v4l2',
+    '-i', '/dev/video0',
+    '-vf', 'scale=320:240',
+    '-q:v', '5',
+    '-f', 'mjpeg',
+    'pipe:1'
+]
+CAMERA_READ_SIZE = 65536
+CAMERA_CLIENT_FRAMES = 2  # per-client backlog; older frames are dropped
+
+# Audio configuration
+SAMPLE_RATE = 44100
+CHANNELS = 1
+DEVICE = 'plughw:0,0'
+CHUNK_SIZE = 4096
+AUDIO_CMD = [
+    'arecord',
+    '-D', DEVICE,
+    '-c', str(CHANNELS),
+    '-r', str(SAMPLE_RATE),
+    '-f', 'S16_LE',
+    '-t', 'raw'
+]
+AUDIO_CLIENT_CHUNKS = 50
+SILENCE = bytes(CHUNK_SIZE)  # sent for silent chunks on /audio?gate=1 only
+SILENCE_KEEPALIVE = 1.0
+
+# LCD configuration (16x2 or 20x4)
+LCD_COLS = 16
+LCD_ROWS = 2
+
+# Lidar configuration
+LIDAR_PORT = os.environ.get('LIDAR_PORT', '/dev/ttyUSB0')
+SLAM_PROCESS = False    # map in a separate process via shared memory
+MAP_RENDER_WORKERS = 0  # processes for map render + PNG encode (0 = thread executor)
+
+app = Quart(__name__)
+app.config['RESPONSE_TIMEOUT'] = None  # streams are long-lived
+
+# Hardware objects are built in startup(), not at import: spawned children
+# (SLAM process, render pool) re-import this script as __mp_main__.
+camera = None
+audio_source = None
+lcd_writer = None
+lcd_status = None
+slam = None
+
+
+# -----------------------------
+# Fan-out
+# -----------------------------
+class FanOut:
+    """Broadcast items to per-client asyncio queues, dropping the oldest for slow clients."""
+
+    def __init__(self, name, maxsize):
+        self.name = name
+        self.maxsize = maxsize
+        self.clients = set()
+        STREAM_CLIENTS.set_function(lambda: len(self.clients), stream=name)
+
+    def subscribe(self):
+        q = asyncio.Queue(maxsize=self.maxsize)
+        self.clients.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        self.clients.discard(q)
+
+    def publish(self, item):
+        for q in self.clients:
+            if q.full():
+                q.get_nowait()
+                STREAM_DROPS.inc(stream=self.name)
+            q.put_nowait(item)
+
+    def depth(self):
+        """Deepest client backlog."""
+        return max((q.qsize() for q in self.clients), default=0)
+
+    def close(self):
+        """Send end-of-stream (None) to every client and drop them."""
+        self.publish(None)
+        self.clients.clear()
+
+
+# -----------------------------
+# Camera
+# -----------------------------
+class CameraSource:
+    """One shared ffmpeg process, running only while someone is watching."""
+
+    def __init__(self, cmd):
+        self.cmd = cmd
+        self.frames = FanOut('camera', CAMERA_CLIENT_FRAMES)
+        self.task = None
+        self.status = DeviceState('camera', IDLE)
+
+    def ensure_running(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        # Viewers may subscribe while the previous ffmpeg is being reaped;
+        # they would otherwise wait on a task that is already finishing.
+        while True:
+            await self.capture()
+            if not self.frames.clients:
+                return
+
+    async def capture(self):
+        self.status.set(STARTING)
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *self.cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+        except Exception as e:
+            self.status.set(FAILED, f"Error starting camera: {e}")
+            self.frames.close()
+            return
+        buf = bytearray()
+        exited = False
+        try:
+            while self.frames.clients:
+                chunk = await process.stdout.read(CAMERA_READ_SIZE)
+                if not chunk:
+                    # ffmpeg died: close the viewers' sockets so they reconnect
+                    exited = True
+                    self.frames.close()
+                    break
+                buf += chunk
+                # Split complete JPEGs (SOI 0xFFD8 ... EOI 0xFFD9)
+                while True:
+                    start = buf.find(b'\xff\xd8')
+                    if start < 0:
+                        del buf[:-1]
+                        break
+                    end = buf.find(b'\xff\xd9', start + 2)
+                    if end < 0:
+                        del buf[:start]
+                        break
+                    if self.status.state != READY:
+                        self.status.set(READY, "streaming")
+                    CAMERA_FRAMES_IN.inc()
+                    self.frames.publish(bytes(buf[start:end + 2]))
+                    del buf[:end + 2]
+        finally:
+            # Stopping ffmpeg ourselves (last viewer left, possibly before
+            # the first frame) is not a camera failure; exiting on its own is.
+            if not exited and process.returncode is None:
+                process.terminate()
+            await process.wait()
+            if exited:
+                self.status.set(FAILED, f"ffmpeg exited ({process.returncode})")
+            else:
+                self.status.set(IDLE, "no viewers")
+
+
+camera_bp = Blueprint('camera', __name__)
+
+
+@camera_bp.websocket('/ws/camera')
+async def camera_stream():
+    frames = camera.frames.subscribe()
+    camera.ensure_running()
+    try:
+        while True:
+            frame = await frames.get()
+            if frame is None:
+                await websocket.close(1011, 'camera stopped')
+                return
+            await websocket.send(frame)
+            CAMERA_FRAMES_OUT.inc()
+    finally:
+        camera.frames.unsubscribe(frames)
+
+
+@camera_bp.route('/camera')
+async def camera_page():
+    return await render_template('camera.html')
+
+
+# -----------------------------
+# Audio + LCD
+# -----------------------------
+def wav_header():
+    """Streaming WAV header with unknown (max) length."""
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 0xFFFFFFFF, b'WAVE', b'fmt ', 16, 1, CHANNELS, SAMPLE_RATE,
+        SAMPLE_RATE * CHANNELS * 2, CHANNELS * 2, 16, b'data', 0xFFFFFFFF)
+
+
+class AudioSource:
+    """Continuous arecord capture feeding the level meter and all listeners."""
+
+    def __init__(self, cmd):
+        self.cmd = cmd
+        self.chunks = FanOut('audio', AUDIO_CLIENT_CHUNKS)
+        self.meter = LevelMeter(SAMPLE_RATE, CHANNELS)
+        self.task = None
+        self.status = DeviceState('mic')
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        self.status.set(STARTING)
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *self.cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+        except Exception as e:
+            self.status.set(FAILED, f"Error in audio capture: {e}")
+            return
+        try:
+            while True:
+                try:
+                    data = await process.stdout.readexactly(CHUNK_SIZE)
+                except asyncio.IncompleteReadError:
+                    break
+                # The first chunk is the readiness check
+                if self.status.state != READY:
+                    self.status.set(READY, f"capturing from {DEVICE}")
+                    if lcd_writer:
+                        lcd_writer.show('Audio Server\nStreaming...')
+                AUDIO_CHUNKS_IN.inc()
+                voiced = self.meter.update(data)
+                if not voiced:
+                    AUDIO_SILENT_CHUNKS.inc()
+                self.chunks.publish((data, voiced))
+        finally:
+            if process.returncode is None:
+                process.terminate()
+                await process.wait()
+            self.status.set(FAILED, f"arecord exited ({process.returncode})")
+
+
+audio_bp = Blueprint('audio', __name__)
+
+
+@audio_bp.route('/mic', methods=['GET', 'POST'])
+async def mic_page():
+    if request.method == 'POST':
+        text = (await request.form).get('lcd_text', '')
+        if lcd_writer and text:
+            lcd_writer.show(text)
+            print(f"📺 LCD Display: {text}")
+        return redirect(url_for('audio.mic_page'))
+    return await render_template('audio_lcd.html')
+
+
+@audio_bp.route('/audio')
+async def audio():
+    """Stream audio data as WAV format"""
+    gate = request.args.get('gate') == '1'
+
+    async def generate_wav():
+        chunks = audio_source.chunks.subscribe()
+        try:
+            yield wav_header()
+            last_sent = 0.0
+            while True:
+                try:
+                    data, voiced = await asyncio.wait_for(chunks.get(), timeout=2.0)
+                except asyncio.TimeoutError:
+                    AUDIO_UNDERRUNS.inc()
+                    data, voiced = SILENCE, False
+                if gate and not voiced:
+                    now = time.time()
+                    if now - last_sent < SILENCE_KEEPALIVE:
+                        continue
+                    last_sent = now
+                    data = SILENCE
+                else:
+                    last_sent = time.time()
+                yield data
+        finally:
+            audio_source.chunks.unsubscribe(chunks)
+
+    return Response(generate_wav(), mimetype='audio/wav', headers={'Cache-Control': 'no-cache'})
+
+
+@audio_bp.route('/level')
+async def level():
+    """Live microphone level and voice activity"""
+    return jsonify(audio_source.meter.snapshot())
+
+
+@audio_bp.route('/lcd_vu', methods=['POST'])
+async def lcd_vu():
+    if lcd_writer:
+        lcd_writer.show_live(lambda: audio_source.meter.vu_text(LCD_COLS), 0.1)
+    return "OK"
+
+
+@audio_bp.route('/clear_lcd', methods=['POST'])
+async def clear_lcd():
+    if lcd_writer:
+        lcd_writer.clear()
+    return "OK"
+
+
+@audio_bp.route('/show_time', methods=['POST'])
+async def show_time():
+    if lcd_writer:
+        lcd_writer.show_clock()
+    return "OK"
+
+
+# -----------------------------
+# SLAM
+# -----------------------------
+slam_bp = Blueprint('slam', __name__)
+
+# PNG encoding runs in an executor (the render pool if enabled) and is
+# shared by all pollers until the map changes.
+render_pool = None
+_map_cache = {'key': None, 'image': None}
+_map_lock = asyncio.Lock()
+
+
+@slam_bp.route('/slam')
+async def slam_page():
+    return await render_template('slam.html')
+
+
+@slam_bp.route('/map_data')
+async def map_data():
+    try:
+        async with _map_lock:
+            key = (slam.scan_count, slam.total_points)
+            if _map_cache['key'] != key:
+                loop = asyncio.get_running_loop()
+                with SLAM_RENDER_SECONDS.time():
+                    # The snapshot may wait on the SLAM process; keep it off the loop
+                    grid = await loop.run_in_executor(None, slam.map_snapshot)
+                    _map_cache['image'] = await loop.run_in_executor(
+                        render_pool, render_map_png, grid, slam.robot_x, slam.robot_y)
+                _map_cache['key'] = key
+        return jsonify({
+            'image': _map_cache['image'],
+            'scan_count': slam.scan_count,
+            'total_points': slam.total_points,
+            'running': slam.running
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@slam_bp.route('/clear_map', methods=['POST'])
+async def clear_map():
+    slam.clear()
+    _map_cache['key'] = None
+    return jsonify({'success': True})
+
+
+# -----------------------------
+# App
+# -----------------------------
+app.register_blueprint(camera_bp)
+app.register_blueprint(audio_bp)
+app.register_blueprint(slam_bp)
+
+
+@app.route('/')
+async def index():
+    return await render_template('gateway.html')
+
+
+@app.route('/metrics')
+async def metrics_endpoint():
+    return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
+
+
+@app.route('/debug/profile')
+async def debug_profile():
+    return Response(metrics.profile_report(request.args.get('reset') == '1'), mimetype='text/plain')
+
+
+@app.route('/health')
+async def health():
+    report = health_report(camera.status, audio_source.status, lcd_status, slam.status)
+    report["camera_clients"] = len(camera.frames.clients)
+    report["audio_clients"] = len(audio_source.chunks.clients)
+    return report
+
+
+@app.before_serving
+async def startup():
+    # Hardware comes up in the background; progress is reported on /health
+    global camera, audio_source, lcd_writer, lcd_status, slam, render_pool
+    metrics.profile_thread('event-loop')
+    camera = CameraSource(CAMERA_CMD)
+    audio_source = AudioSource(AUDIO_CMD)
+    AUDIO_QUEUE_DEPTH.set_function(audio_source.chunks.depth)
+
+    # LCD; opened lazily on the LCDWriter thread, which also does all writes
+    if LCD_AVAILABLE:
+        lcd_writer = LCDWriter(
+            cols=LCD_COLS, rows=LCD_ROWS,
+            opener=lambda: CharLCD('PCF8574', 0x27, cols=LCD_COLS, rows=LCD_ROWS))
+        lcd_status = lcd_writer.status
+        lcd_writer.start()
+        lcd_writer.show('Audio Server\nStarting...')
+    else:
+        print("⚠ LCD library not available")
+        lcd_status = DeviceState('lcd')
+        lcd_status.set(FAILED, 'LCD library not available')
+
+    slam = SLAMProcess(LIDAR_PORT) if SLAM_PROCESS else RPLidarSLAM(LIDAR_PORT)
+    SLAM_SCANS.set_function(lambda: slam.scan_count)
+    SLAM_POINTS.set_function(lambda: slam.total_points)
+    if MAP_RENDER_WORKERS:
+        render_pool = ProcessPoolExecutor(MAP_RENDER_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    audio_source.start()
+    slam.start()
+
+
+@app.after_serving
+async def shutdown():
+    slam.stop()
+    if render_pool:
+        render_pool.shutdown(cancel_futures=True)
+    if lcd_writer:
+        lcd_writer.stop()
+    print("✅ Shutdown complete")
+
+
+if __name__ == '__main__':
+    config = Config()
+    config.bind = [f"0.0.0.0:{PORT}"]
+    print("=" * 50)
+    print("🤖 FIRE-BOT GATEWAY")
+    print(f"📱 Open your browser: http://localhost:{PORT}")
+    print("=" * 50)
+    asyncio.run(serve(app, config))
@@ -0,0 +1,168 @@
+"""
+Asynchronous character LCD writer for the PCF8574 I2C backpack.
+
+All I2C traffic goes through a single worker thread fed by a queue:
+  - HTTP handlers only enqueue the requested content and return immediately.
+  - Bursts of requests coalesce; the worker only draws the latest one.
+  - A shadow framebuffer of the 16x2 / 20x4 screen is kept, and only the
+    character cells that changed are sent (no clear + full redraw).
+  - "Live" content (e.g. a clock) is re-rendered by the worker on a timer,
+    so no request per tick is needed.
+  - The display itself can be opened lazily on the worker thread (`opener`),
+    so I2C initialization never delays server startup.
+"""
+
+import queue
+import threading
+import time
+from datetime import datetime
+
+from device_status import DeviceState, FAILED, READY, STARTING
+from metrics import LCD_WRITE_SECONDS
+
+CLOCK_FORMAT = "%H:%M:%S\n%d/%m/%Y"
+
+
+class LCDWriter:
+    def __init__(self, lcd=None, cols=16, rows=2, opener=None):
+        self.lcd = lcd
+        self.opener = opener
+        self.cols = cols
+        self.rows = rows
+        self.status = DeviceState('lcd', READY if lcd else STARTING)
+
+        # What we believe is on the glass; None means "unknown, redraw".
+        self.shadow = None
+
+        # Commands: ('text', str) | ('live', render_fn, interval) | ('stop',)
+        self.commands = queue.Queue()
+        self.thread = None
+
+    # -----------------------------
+    # Public API (non-blocking)
+    # -----------------------------
+    def start(self):
+        """Start the LCD worker thread."""
+        if self.thread and self.thread.is_alive():
+            return
+        self.thread = threading.Thread(target=self._worker, name='lcd-writer', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the worker after it finishes the current write."""
+        self.commands.put(('stop',))
+        if self.thread:
+            self.thread.join(timeout=2)
+
+    def show(self, text):
+        """Display static text; long lines wrap onto the next row."""
+        self._put(('text', text))
+
+    def clear(self):
+        """Blank the display."""
+        self._put(('text', ''))
+
+    def show_live(self, render, interval=1.0):
+        """Redraw render() every interval seconds until other content is shown."""
+        self._put(('live', render, interval))
+
+    def show_clock(self, fmt=CLOCK_FORMAT):
+        """Continuously updated clock, ticking on wall-clock second boundaries."""
+        self.show_live(lambda: datetime.now().strftime(fmt), 1.0)
+
+    def _put(self, cmd):
+        # Nothing will drain the queue once the display has failed to open
+        if self.status.state != FAILED:
+            self.commands.put(cmd)
+
+    # -----------------------------
+    # Rendering
+    # -----------------------------
+    def layout(self, text):
+        """Split text into exactly `rows` strings of exactly `cols` characters."""
+        lines = []
+        for segment in text.split('\n'):
+            if not segment:
+                lines.append('')
+            while segment:
+                lines.append(segment[:self.cols])
+                segment = segment[self.cols:]
+        lines = (lines + [''] * self.rows)[:self.rows]
+        return [line.ljust(self.cols) for line in lines]
+
+    def draw(self, text):
+        """Send only the changed cells between the shadow buffer and text."""
+        frame = self.layout(text)
+        if self.shadow is None:
+            self.lcd.clear()
+            self.shadow = [' ' * self.cols for _ in range(self.rows)]
+
+        for row, (old, new) in enumerate(zip(self.shadow, frame)):
+            if old == new:
+                continue
+            col = 0
+            while col < self.cols:
+                if old[col] == new[col]:
+                    col += 1
+                    continue
+                # Extend the run; bridge single unchanged cells, since
+                # rewriting one character costs no more than a cursor move.
+                end = col + 1
+                while end < self.cols and (old[end] != new[end] or
+                                           (end + 1 < self.cols and old[end + 1] != new[end + 1])):
+                    end += 1
+                self.lcd.cursor_pos = (row, col)
+                self.lcd.write_string(new[col:end])
+                col = end
+            self.shadow[row] = new
+
+    def _worker(self):
+        if self.lcd is None:
+            try:
+                self.lcd = self.opener()
+                self.status.set(READY)
+            except Exception as e:
+                self.status.set(FAILED, f"LCD initialization failed: {e}")
+                return
+
+        live = None          # (render_fn, interval) while in live mode
+        next_tick = None
+
+        while True:
+            timeout = None
+            if live:
+                timeout = max(0.0, next_tick - time.time())
+            try:
+                cmd = self.commands.get(timeout=timeout)
+                # Coalesce: skip straight to the most recent request.
+                while True:
+                    try:
+                        cmd = self.commands.get_nowait()
+                    except queue.Empty:
+                        break
+            except queue.Empty:
+                cmd = None  # live tick
+
+            if cmd and cmd[0] == 'stop':
+                return
+            if cmd and cmd[0] == 'text':
+                live = None
+                text = cmd[1]
+            else:
+                if cmd:
+                    live = (cmd[1], cmd[2])
+                render, interval = live
+                now = time.time()
+                next_tick = (now // interval + 1) * interval
+                try:
+                    text = render()
+                except Exception as e:
+                    print(f"⚠ LCD render error: {e}")
+                    continue
+
+            try:
+                with LCD_WRITE_SECONDS.time():
+                    self.draw(text)
+            except Exception as e:
+                print(f"❌ LCD write failed: {e}")
+                self.shadow = None  # state unknown; full redraw next time
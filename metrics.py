@@ -0,0 +1,307 @@
+"""
+Shared instrumentation for all streaming subsystems.
+
+  - Counters, gauges and latency histograms, rendered in the Prometheus text
+    exposition format by render() (served as /metrics).
+  - An opt-in sampling profiler for the hot loops (FIREBOT_PROFILE=1). Hot
+    loops call profile_thread() once; a background thread then samples only
+    those threads' stacks every FIREBOT_PROFILE_INTERVAL seconds, and
+    /debug/profile returns them as collapsed stacks (flamegraph.pl / speedscope).
+
+No third-party dependencies, so every script can import it.
+"""
+
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import Counter as _StackCounts
+from contextlib import contextmanager
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; tuned for per-chunk / per-frame / per-scan work on a Pi
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in list(self.metrics):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def _label_str(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    body = ','.join(f'{k}="{v}"' for k, v in pairs)
+    return '{' + body + '}'
+
+
+def _fmt(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = 'untyped'
+
+    def __init__(self, name, help, registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.values = {}
+        self.lock = threading.Lock()
+        registry.register(self)
+
+    @staticmethod
+    def _key(labels):
+        return tuple(sorted(labels.items()))
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            items = list(self.values.items()) or [((), 0)]
+        return [f"{self.name}{_label_str(k)} {_fmt(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    type = 'gauge'
+
+    def __init__(self, name, help, registry=REGISTRY):
+        super().__init__(name, help, registry)
+        self.functions = {}
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn, **labels):
+        """Evaluate fn() at scrape time (queue depths, client counts)."""
+        with self.lock:
+            self.functions[self._key(labels)] = fn
+
+    def samples(self):
+        with self.lock:
+            items = dict(self.values)
+            functions = list(self.functions.items())
+        for key, fn in functions:
+            try:
+                items[key] = fn()
+            except Exception:
+                continue
+        if not items:
+            items = {(): 0}
+        return [f"{self.name}{_label_str(k)} {_fmt(v)}" for k, v in items.items()]
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS, registry=REGISTRY):
+        super().__init__(name, help, registry)
+        self.buckets = tuple(buckets)
+        self.functions = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][i] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels):
+        """(per-bucket counts, sum) for one label set, e.g. to publish elsewhere."""
+        with self.lock:
+            entry = self.values.get(self._key(labels))
+            if entry is None:
+                return [0] * (len(self.buckets) + 1), 0.0
+            return list(entry[0]), entry[1]
+
+    def set_function(self, fn, **labels):
+        """Take (per-bucket counts, sum) from fn() at scrape time, e.g. from another process."""
+        with self.lock:
+            self.functions[self._key(labels)] = fn
+
+    def samples(self):
+        with self.lock:
+            values = {k: (list(counts), total) for k, (counts, total) in self.values.items()}
+            functions = list(self.functions.items())
+        for key, fn in functions:
+            try:
+                value = fn()
+            except Exception:
+                continue
+            if value is not None:
+                values[key] = value
+        items = [(k, counts, total) for k, (counts, total) in values.items()]
+        if not items:
+            items = [((), [0] * (len(self.buckets) + 1), 0.0)]
+        out = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                out.append(f"{self.name}_bucket{_label_str(key, [('le', _fmt(bound))])} {cumulative}")
+            out.append(f"{self.name}_sum{_label_str(key)} {_fmt(total)}")
+            out.append(f"{self.name}_count{_label_str(key)} {cumulative}")
+        return out
+
+
+def render():
+    """All registered metrics in Prometheus text format."""
+    return REGISTRY.render()
+
+
+# -----------------------------
+# Shared metrics
+# -----------------------------
+CAMERA_FRAMES_IN = Counter('firebot_camera_frames_in_total', 'JPEG frames read from ffmpeg')
+CAMERA_FRAMES_OUT = Counter('firebot_camera_frames_out_total', 'JPEG frames sent to WebSocket clients')
+STREAM_CLIENTS = Gauge('firebot_stream_clients', 'Connected clients per stream')
+STREAM_DROPS = Counter('firebot_stream_drops_total', 'Items dropped for slow clients or full queues, per stream')
+
+AUDIO_CHUNKS_IN = Counter('firebot_audio_chunks_in_total', 'PCM chunks read from arecord')
+AUDIO_SILENT_CHUNKS = Counter('firebot_audio_silent_chunks_total', 'PCM chunks the level meter classed as silent')
+AUDIO_QUEUE_DEPTH = Gauge('firebot_audio_queue_depth', 'Chunks waiting in the audio queue (deepest client)')
+AUDIO_UNDERRUNS = Counter('firebot_audio_underruns_total', 'Times a listener waited 2 s with no audio and got silence')
+
+LCD_WRITE_SECONDS = Histogram('firebot_lcd_write_seconds', 'Time to push one frame of changed cells to the LCD')
+
+SLAM_PARSE_SECONDS = Histogram('firebot_slam_parse_seconds', 'Time to read and parse one batch of lidar nodes')
+SLAM_UPDATE_SECONDS = Histogram('firebot_slam_update_seconds', 'Time to ray-trace one batch into the occupancy grid')
+SLAM_RENDER_SECONDS = Histogram('firebot_slam_render_seconds', 'Time to render and PNG-encode the map')
+SLAM_SCANS = Gauge('firebot_slam_scans', 'Scans integrated into the current map')
+SLAM_POINTS = Gauge('firebot_slam_points', 'Points integrated into the current map')
+
+
+# -----------------------------
+# Sampling profiler
+# -----------------------------
+PROFILE_ENABLED = os.environ.get('FIREBOT_PROFILE') == '1'
+PROFILE_INTERVAL = float(os.environ.get('FIREBOT_PROFILE_INTERVAL', '0.01'))
+
+
+class SamplingProfiler:
+    """Periodically samples the stacks of registered threads only."""
+
+    def __init__(self, interval=PROFILE_INTERVAL, max_depth=40):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.threads = {}  # ident -> name
+        self.stacks = _StackCounts()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def register(self, name=None):
+        """Sample the calling thread from now on."""
+        current = threading.current_thread()
+        with self.lock:
+            self.threads[current.ident] = name or current.name
+        self.start()
+
+    def unregister(self):
+        """Stop sampling the calling thread (before it exits, so its ident can be reused)."""
+        with self.lock:
+            self.threads.pop(threading.get_ident(), None)
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                # Under the lock, so a thread registering now is in frames
+                frames = sys._current_frames()
+                # Forget threads that exited without unregistering
+                for ident in [i for i in self.threads if i not in frames]:
+                    del self.threads[ident]
+                threads = list(self.threads.items())
+            for ident, name in threads:
+                frame = frames[ident]
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(name)
+                key = ';'.join(reversed(stack))
+                with self.lock:
+                    self.stacks[key] += 1
+
+    def collapsed(self, reset=False):
+        """Collapsed stack text: one `frame;frame;... count` line per stack."""
+        with self.lock:
+            lines = [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+            if reset:
+                self.stacks.clear()
+        return '\n'.join(lines) + '\n'
+
+
+PROFILER = SamplingProfiler()
+
+
+def profile_thread(name=None):
+    """Hook for hot loops: include this thread in profiles when FIREBOT_PROFILE=1."""
+    if PROFILE_ENABLED:
+        PROFILER.register(name)
+
+
+def profile_thread_done():
+    """Pair with profile_thread() in short-lived threads, e.g. per-connection handlers."""
+    if PROFILE_ENABLED:
+        PROFILER.unregister()
+
+
+def profile_report(reset=False):
+    if not PROFILE_ENABLED:
+        return "profiling disabled; start with FIREBOT_PROFILE=1\n"
+    return PROFILER.collapsed(reset=reset)
@@ -2,6 +2,11 @@
 """
 Real RPLidar A1 Web SLAM - Complete Working Version
 Serves a live 2D occupancy map at http://localhost:5000
+
+With SLAM_PROCESS = True the mapping loop runs in its own process and
+publishes the occupancy grid through shared memory, so web requests (and
+PNG encoding, optionally in RENDER_WORKERS processes) never compete with
+mapping for the GIL.
 """
 
 import numpy as np
@@ -9,16 +14,56 @@ import time
 import threading
 import base64
 import io
+import multiprocessing
+import os
 import serial
 import math
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 from PIL import Image
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify, render_template, request
+
+from device_status import DeviceState, FAILED, IDLE, PENDING, READY, STARTING, health_report
+import metrics
+from metrics import (LATENCY_BUCKETS, SLAM_PARSE_SECONDS, SLAM_POINTS, SLAM_RENDER_SECONDS, SLAM_SCANS,
+                     SLAM_UPDATE_SECONDS)
+
+# Lidar serial port (LIDAR_PORT overrides, e.g. for bench/fake_lidar.py)
+LIDAR_PORT = os.environ.get('LIDAR_PORT', '/dev/ttyUSB0')
+
+# Map configuration
+MAP_SIZE = 600
+MAP_METERS = 20.0
+
+# Run RPLidarSLAM in a separate process (shared-memory map)
+SLAM_PROCESS = False
+# Max wait for a consistent copy of the shared map before giving up
+MAP_SNAPSHOT_TIMEOUT = 0.5
+# Processes used to render + PNG-encode /map_data (0 = in the request thread)
+RENDER_WORKERS = 0
+# Histograms recorded in the SLAM process and published with the map
+SLAM_TIMINGS = (SLAM_PARSE_SECONDS, SLAM_UPDATE_SECONDS)
+
+# Map rendering palette: unknown -> dark gray, free -> light gray, occupied -> white
+MAP_PALETTE = np.zeros((256, 3), dtype=np.uint8)
+MAP_PALETTE[50] = [50, 50, 50]
+MAP_PALETTE[127] = [200, 200, 200]
+MAP_PALETTE[255] = [255, 255, 255]
+ROBOT_RADIUS = 8
+
+# RPLidar protocol
+CMD_STOP = b'\xA5\x25'
+CMD_RESET = b'\xA5\x40'
+CMD_SCAN = b'\xA5\x20'
+SCAN_DESCRIPTOR = b'\xA5\x5A\x05\x00\x00\x40\x81'
+LIDAR_READY_TIMEOUT = 2.0  # max wait for the scan response descriptor
+
 
 class RPLidarSLAM:
-    def _init_(self, port='/dev/ttyUSB0'):
+    def __init__(self, port='/dev/ttyUSB0', shared=None):
         # Map configuration
-        self.MAP_SIZE = 600
-        self.MAP_METERS = 20.0
+        self.MAP_SIZE = MAP_SIZE
+        self.MAP_METERS = MAP_METERS
         self.PIXELS_PER_METER = self.MAP_SIZE / self.MAP_METERS
 
         # Robot in center of the map
@@ -36,39 +81,66 @@ class RPLidarSLAM:
         # Serial
         self.port = port
         self.serial_conn = None
+        self.pending = b''  # partial node carried over to the next read
 
         # Thread
         self.thread = None
+        self.status = DeviceState('lidar')
+
+        # SharedMap to publish into when running inside a SLAMProcess
+        self.shared = shared
 
     def connect_lidar(self):
-        """Open serial and start RPLidar scanning."""
+        """Open serial and start RPLidar scanning.
+
+        Readiness is the scan response descriptor, not a fixed delay. Only if
+        it never arrives is the device reset (and its boot banner drained)
+        before one more attempt.
+        """
         try:
             print(f"🔄 Connecting to RPLidar on {self.port}...")
-            self.serial_conn = serial.Serial(self.port, 115200, timeout=1)
-            time.sleep(2)
-
-            # Stop any ongoing scan
-            self.serial_conn.write(b'\xA5\x25')
-            time.sleep(0.5)
+            self.status.set(STARTING, f"connecting on {self.port}")
+            self.serial_conn = serial.Serial(self.port, 115200, timeout=0.1)
 
-            # Reset
-            self.serial_conn.write(b'\xA5\x40')
-            time.sleep(2)
+            if not self.start_scan():
+                self.serial_conn.write(CMD_RESET)
+                self.drain_input()
+                if not self.start_scan():
+                    raise TimeoutError("no scan response from RPLidar")
 
-            # Clear buffer
-            self.serial_conn.reset_input_buffer()
-
-            # Start scan
-            self.serial_conn.write(b'\xA5\x20')
-            time.sleep(1)
-
-            print("✅ RPLidar connected and scanning")
+            self.status.set(READY, "scanning")
             return True
 
         except Exception as e:
-            print(f"❌ RPLidar connection failed: {e}")
+            self.status.set(FAILED, f"RPLidar connection failed: {e}")
             return False
 
+    def start_scan(self):
+        """Stop any ongoing scan, request a new one and wait for its descriptor."""
+        self.serial_conn.write(CMD_STOP)
+        time.sleep(0.002)  # protocol: >= 1 ms before the next request
+        self.serial_conn.reset_input_buffer()
+        self.serial_conn.write(CMD_SCAN)
+
+        deadline = time.time() + LIDAR_READY_TIMEOUT
+        buf = b''
+        while time.time() < deadline:
+            buf += self.serial_conn.read(max(1, self.serial_conn.in_waiting))
+            if SCAN_DESCRIPTOR in buf:
+                # Nodes may follow the descriptor in the same read
+                self.pending = buf[buf.index(SCAN_DESCRIPTOR) + len(SCAN_DESCRIPTOR):]
+                return True
+            buf = buf[-(len(SCAN_DESCRIPTOR) - 1):]
+        return False
+
+    def drain_input(self, quiet=0.2):
+        """Discard input until the line has been quiet for `quiet` seconds."""
+        deadline = time.time() + LIDAR_READY_TIMEOUT
+        last_data = time.time()
+        while time.time() < deadline and time.time() - last_data < quiet:
+            if self.serial_conn.read(max(1, self.serial_conn.in_waiting)):
+                last_data = time.time()
+
     def read_scan_data(self):
         """Read and parse data from RPLidar (simple 5-byte node parser)."""
         if not self.serial_conn:
@@ -77,13 +149,15 @@ class RPLidarSLAM:
         scan_points = []
         try:
             if self.serial_conn.in_waiting > 10:
-                data = self.serial_conn.read(min(self.serial_conn.in_waiting, 1000))
+                # Reads split nodes; start from the tail left by the last one
+                data = self.pending + self.serial_conn.read(min(self.serial_conn.in_waiting, 1000))
 
                 i = 0
-                # Each node is 5 bytes: check start bit on first byte
+                # Each node is 5 bytes: start flag S and its inverse in
+                # bits 0/1 of the first byte, check bit C = 1 in the second
                 while i < len(data) - 4:
                     b0 = data[i]
-                    if b0 & 0x01:
+                    if (b0 & 0x01) != ((b0 >> 1) & 0x01) and data[i+1] & 0x01:
                         try:
                             quality = (b0 >> 2) & 0x3F
                             angle_raw = (data[i+1] | (data[i+2] << 8)) >> 1  # Q6
@@ -99,6 +173,7 @@ class RPLidarSLAM:
                             i += 1
                     else:
                         i += 1
+                self.pending = data[i:]
         except Exception as e:
             print(f"⚠ Read error: {e}")
 
@@ -151,25 +226,25 @@ class RPLidarSLAM:
             # Mark free space along the ray
             self.mark_free_line(self.robot_x, self.robot_y, x, y)
 
+    def map_snapshot(self):
+        """Return a private copy of the occupancy grid."""
+        return self.map_data.copy()
+
     def get_map_image(self):
         """Return RGB image array for current map."""
-        map_rgb = np.zeros((self.MAP_SIZE, self.MAP_SIZE, 3), dtype=np.uint8)
-        map_rgb[self.map_data == 50] = [50, 50, 50]       # unknown -> dark gray
-        map_rgb[self.map_data == 127] = [200, 200, 200]   # free -> light gray
-        map_rgb[self.map_data == 255] = [255, 255, 255]   # occupied -> white
-
-        # Draw robot as a red circle
-        r = 8
-        y0 = max(0, self.robot_y - r)
-        y1 = min(self.MAP_SIZE, self.robot_y + r)
-        x0 = max(0, self.robot_x - r)
-        x1 = min(self.MAP_SIZE, self.robot_x + r)
-        for yy in range(y0, y1):
-            for xx in range(x0, x1):
-                if (xx - self.robot_x) ** 2 + (yy - self.robot_y) ** 2 <= r * r:
-                    map_rgb[yy, xx] = [255, 0, 0]
-
-        return map_rgb
+        return render_map(self.map_data, self.robot_x, self.robot_y)
+
+    def clear(self):
+        """Reset the map and stats."""
+        self.map_data.fill(50)
+        self.scan_count = 0
+        self.total_points = 0
+        self.publish()
+
+    def publish(self):
+        """Copy map and stats to shared memory (no-op when not in a SLAMProcess)."""
+        if self.shared:
+            self.shared.publish(self.map_data, self.scan_count, self.total_points, self.running)
 
     def slam_loop(self):
         """Main loop: connect lidar, read points, update map."""
@@ -178,23 +253,32 @@ class RPLidarSLAM:
             return
 
         self.running = True
+        self.publish()
+        metrics.profile_thread('slam')
         print("🔄 SLAM loop started")
 
         try:
             while self.running:
-                points = self.read_scan_data()
+                with SLAM_PARSE_SECONDS.time():
+                    points = self.read_scan_data()
                 if points:
-                    self.update_map(points)
+                    with SLAM_UPDATE_SECONDS.time():
+                        self.update_map(points)
                     self.scan_count += 1
                     self.total_points += len(points)
+                    self.publish()
 
                     if self.scan_count % 20 == 0:
                         print(f"📡 Scans: {self.scan_count} | Points: {self.total_points}")
 
                 time.sleep(0.05)  # ~20 Hz loop
+            self.status.set(IDLE, "stopped")
         except Exception as e:
             print(f"💥 SLAM loop error: {e}")
+            self.status.set(FAILED, f"SLAM loop error: {e}")
         finally:
+            self.running = False
+            self.publish()
             # Stop scan and close port
             try:
                 if self.serial_conn:
@@ -222,74 +306,296 @@ class RPLidarSLAM:
             self.thread.join(timeout=2)
 
 
+def render_map(map_data, robot_x, robot_y):
+    """Return RGB image array for an occupancy grid, robot drawn as a red circle."""
+    map_rgb = MAP_PALETTE[map_data]
+    r = ROBOT_RADIUS
+    y0, y1 = max(0, robot_y - r), min(map_data.shape[0], robot_y + r)
+    x0, x1 = max(0, robot_x - r), min(map_data.shape[1], robot_x + r)
+    yy, xx = np.ogrid[y0:y1, x0:x1]
+    robot = (xx - robot_x) ** 2 + (yy - robot_y) ** 2 <= r * r
+    map_rgb[y0:y1, x0:x1][robot] = [255, 0, 0]
+    return map_rgb
+
+
+def render_map_png(map_data, robot_x, robot_y):
+    """Render and encode in one call (picklable, for the render pool)."""
+    return encode_map_png(render_map(map_data, robot_x, robot_y))
+
+
+# -----------------------------
+# Process-isolated SLAM
+# -----------------------------
+class SharedMap:
+    """
+    Occupancy grid + stats in multiprocessing.shared_memory, guarded by a seqlock.
+
+    Layout: int64 header [seq, scan_count, total_points, running], a short
+    UTF-8 failure detail from the child, float64 [bucket counts..., sum] per
+    SLAM_TIMINGS histogram, then the uint8 grid. The single writer makes seq
+    odd while copying; readers retry until they see the same even seq before
+    and after their copy, or fall back to their last consistent copy if the
+    writer died mid-publish.
+    """
+
+    HEADER_WORDS = 4
+    DETAIL_BYTES = 120
+
+    def __init__(self, size, name=None):
+        header_bytes = self.HEADER_WORDS * 8
+        timings_offset = header_bytes + self.DETAIL_BYTES
+        timings_shape = (len(SLAM_TIMINGS), len(LATENCY_BUCKETS) + 2)
+        grid_offset = timings_offset + timings_shape[0] * timings_shape[1] * 8
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=grid_offset + size * size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.write_lock = threading.Lock()  # writers in the owning process
+        self.last = None  # last consistent snapshot seen by this reader
+        self.header = np.ndarray((self.HEADER_WORDS,), dtype=np.int64, buffer=self.shm.buf)
+        self.detail_buf = self.shm.buf[header_bytes:timings_offset]
+        self.timings = np.ndarray(timings_shape, dtype=np.float64, buffer=self.shm.buf, offset=timings_offset)
+        self.grid = np.ndarray((size, size), dtype=np.uint8, buffer=self.shm.buf, offset=grid_offset)
+        if name is None:
+            self.header[:] = 0
+            self.detail_buf[:] = bytes(self.DETAIL_BYTES)
+            self.timings.fill(0)
+            self.grid.fill(50)
+
+    @property
+    def version(self):
+        return int(self.header[0])
+
+    @property
+    def detail(self):
+        """Failure detail left by the child ('' if none)."""
+        return bytes(self.detail_buf).rstrip(b'\0').decode(errors='replace')
+
+    def set_detail(self, text):
+        data = text.encode()[:self.DETAIL_BYTES]
+        self.detail_buf[:] = data.ljust(self.DETAIL_BYTES, b'\0')
+
+    def publish(self, grid, scan_count, total_points, running):
+        """Writer side: bump seq to odd, copy, bump back to even."""
+        with self.write_lock:
+            self.header[0] += 1
+            np.copyto(self.grid, grid)
+            self.header[1] = scan_count
+            self.header[2] = total_points
+            self.header[3] = int(running)
+            for row, histogram in zip(self.timings, SLAM_TIMINGS):
+                counts, total = histogram.snapshot()
+                row[:-1] = counts
+                row[-1] = total
+            self.header[0] += 1
+
+    def _read(self, copy, timeout):
+        """Seqlock read of copy(); None if the writer stays mid-publish past timeout."""
+        deadline = time.monotonic() + timeout
+        while True:
+            seq = int(self.header[0])
+            if not seq & 1:
+                value = copy()
+                if int(self.header[0]) == seq:
+                    return value
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0)
+
+    def snapshot(self, timeout=MAP_SNAPSHOT_TIMEOUT):
+        """Reader side: consistent (grid copy, scan_count, total_points, running)."""
+        value = self._read(lambda: (self.grid.copy(), int(self.header[1]),
+                                    int(self.header[2]), bool(self.header[3])), timeout)
+        if value is None:
+            # seq stays odd forever if the writer was killed mid-publish
+            if self.last is None:
+                raise TimeoutError("shared map stuck mid-update")
+            return self.last
+        self.last = value
+        return value
+
+    def timing(self, index, timeout=MAP_SNAPSHOT_TIMEOUT):
+        """(bucket counts, sum) of SLAM_TIMINGS[index] as last published, or None."""
+        row = self._read(self.timings[index].copy, timeout)
+        if row is None:
+            return None
+        return [int(c) for c in row[:-1]], float(row[-1])
+
+    def close(self, unlink=False):
+        # Drop numpy views before closing the mapping
+        self.header = self.grid = self.timings = None
+        self.detail_buf.release()
+        self.detail_buf = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def _slam_process_main(port, shm_name, stop_event, clear_event):
+    """Child process entry: run RPLidarSLAM publishing into shared memory."""
+    shared = SharedMap(MAP_SIZE, name=shm_name)
+    slam = RPLidarSLAM(port, shared=shared)
+
+    def watch_events():
+        # Poll rather than Event.wait(): a process exiting mid-wait leaves
+        # the Event's condition in a state where the parent's set() blocks.
+        while not stop_event.is_set():
+            time.sleep(0.1)
+            if clear_event.is_set():
+                clear_event.clear()
+                slam.clear()
+        slam.running = False
+
+    threading.Thread(target=watch_events, daemon=True).start()
+    try:
+        slam.slam_loop()
+    finally:
+        # The parent only sees an exit code; leave it the reason too
+        if slam.status.state == FAILED:
+            shared.set_detail(slam.status.detail)
+        shared.close()
+
+
+class SLAMProcess:
+    """Drop-in replacement for RPLidarSLAM that maps in a separate process."""
+
+    def __init__(self, port='/dev/ttyUSB0'):
+        self.port = port
+        self.MAP_SIZE = MAP_SIZE
+        self.robot_x = MAP_SIZE // 2
+        self.robot_y = MAP_SIZE // 2
+
+        # Created in start() so constructing one stays cheap
+        self.shared = None
+        self.process = None
+        self.ctx = multiprocessing.get_context('spawn')
+        self.stop_event = None
+        self.clear_event = None
+        self._status = DeviceState('lidar')
+
+    @property
+    def status(self):
+        """Lidar state, derived from the child process and its shared stats."""
+        # Liveness first: a killed child leaves `running` set in shared memory
+        if self.process is None:
+            state, detail = PENDING, ''
+        elif not self.process.is_alive():
+            if self.stop_event.is_set() and self.process.exitcode == 0:
+                state, detail = IDLE, "stopped"
+            else:
+                reason = self.shared.detail if self.shared else ''
+                state, detail = FAILED, reason or f"SLAM process exited ({self.process.exitcode})"
+        elif self.running:
+            state, detail = READY, "scanning"
+        else:
+            state, detail = STARTING, f"connecting on {self.port}"
+        if (state, detail) != (self._status.state, self._status.detail):
+            self._status.set(state, detail)
+        return self._status
+
+    @property
+    def scan_count(self):
+        return int(self.shared.header[1]) if self.shared else 0
+
+    @property
+    def total_points(self):
+        return int(self.shared.header[2]) if self.shared else 0
+
+    @property
+    def running(self):
+        return bool(self.shared.header[3]) if self.shared else False
+
+    @property
+    def map_data(self):
+        return self.map_snapshot()
+
+    def map_snapshot(self):
+        if not self.shared:
+            return np.full((MAP_SIZE, MAP_SIZE), 50, dtype=np.uint8)
+        if not self.process.is_alive():
+            # No writer left to finish a publish; don't wait for one
+            return self.shared.snapshot(timeout=0)[0]
+        return self.shared.snapshot()[0]
+
+    def get_map_image(self):
+        return render_map(self.map_snapshot(), self.robot_x, self.robot_y)
+
+    def timing(self, index):
+        if not self.shared:
+            return None
+        # As in map_snapshot(): with the child gone, don't wait for a publish
+        return self.shared.timing(index, timeout=MAP_SNAPSHOT_TIMEOUT if self.process.is_alive() else 0)
+
+    def clear(self):
+        if self.clear_event:
+            self.clear_event.set()
+
+    def start(self):
+        """Start the SLAM child process."""
+        if self.process and self.process.is_alive():
+            return
+        if self.shared is None:
+            self.shared = SharedMap(MAP_SIZE)
+        if self.stop_event is None:
+            self.stop_event = self.ctx.Event()
+            self.clear_event = self.ctx.Event()
+        # Parse/update are timed in the child; serve its numbers from here
+        for index, histogram in enumerate(SLAM_TIMINGS):
+            histogram.set_function(lambda index=index: self.timing(index))
+        self.stop_event.clear()
+        self.process = self.ctx.Process(
+            target=_slam_process_main,
+            args=(self.port, self.shared.name, self.stop_event, self.clear_event),
+            name='slam', daemon=True)
+        self.process.start()
+
+    def stop(self):
+        """Stop the child process and release shared memory."""
+        if self.stop_event:
+            self.stop_event.set()
+        if self.process:
+            self.process.join(timeout=3)
+            if self.process.is_alive():
+                self.process.terminate()
+        if self.shared:
+            self.shared.close(unlink=True)
+            self.shared = None
+
+
+def encode_map_png(map_rgb):
+    """Encode an RGB map array as a base64 PNG string (north up)."""
+    img = Image.fromarray(map_rgb)
+    img = img.transpose(Image.FLIP_TOP_BOTTOM)
+    buf = io.BytesIO()
+    img.save(buf, format='PNG')
+    return base64.b64encode(buf.getvalue()).decode()
+
+
 # Flask app
-app = Flask(_name_)
-slam = RPLidarSLAM('/dev/ttyUSB0')
+app = Flask(__name__)
+# Built in main(), not at import: spawned children (SLAM process, render
+# pool) re-import this script as __mp_main__.
+slam = None
+render_pool = None
 
 
 @app.route('/')
 def index():
     # Simple HTML page that fetches map data
-    return '''
-<!DOCTYPE html>
-<html>
-<head>
-  <title>RPLidar SLAM</title>
-  <style>
-    body { font-family: Arial; background: #f0f0f0; text-align: center; padding: 20px; }
-    .wrap { max-width: 820px; margin: 0 auto; background: #fff; padding: 20px; border-radius: 10px; }
-    #map { border: 3px solid #333; border-radius: 10px; }
-    .stats { display: flex; justify-content: space-around; margin: 15px 0; }
-    .stat { background: #007bff; color: #fff; padding: 10px 15px; border-radius: 8px; }
-    .legend { display: flex; justify-content: center; gap: 12px; margin: 12px 0; }
-    .box { display: inline-flex; align-items: center; gap: 6px; background:#f8f9fa; padding:6px 10px; border-radius: 6px; }
-    .color { width:18px; height:18px; border:1px solid #333; }
-  </style>
-</head>
-<body>
-  <div class="wrap">
-    <h1>🤖 RPLidar A1 Real-Time SLAM</h1>
-    <div class="legend">
-      <div class="box"><div class="color" style="background:#323232;"></div>Unknown</div>
-      <div class="box"><div class="color" style="background:#c8c8c8;"></div>Free</div>
-      <div class="box"><div class="color" style="background:#ffffff;"></div>Obstacle</div>
-      <div class="box"><div class="color" style="background:#ff0000;"></div>Robot</div>
-    </div>
-    <img id="map" src="" width="600" height="600" alt="Map">
-    <div class="stats">
-      <div class="stat">Scans: <span id="scans">0</span></div>
-      <div class="stat">Points: <span id="points">0</span></div>
-    </div>
-  </div>
-
-  <script>
-    function update() {
-      fetch('/map_data').then(r => r.json()).then(d => {
-        if (d.image) {
-          document.getElementById('map').src = 'data:image/png;base64,' + d.image;
-          document.getElementById('scans').textContent = d.scan_count;
-          document.getElementById('points').textContent = d.total_points;
-        }
-      }).catch(_ => {});
-    }
-    setInterval(update, 500);
-    update();
-  </script>
-</body>
-</html>
-    '''
+    return render_template('slam.html')
 
 
 @app.route('/map_data')
 def map_data():
     try:
         # Build image
-        img_arr = slam.get_map_image()
-        img = Image.fromarray(img_arr)
-        img = img.transpose(Image.FLIP_TOP_BOTTOM)
-        buf = io.BytesIO()
-        img.save(buf, format='PNG')
-        img_b64 = base64.b64encode(buf.getvalue()).decode()
+        with SLAM_RENDER_SECONDS.time():
+            if render_pool:
+                img_b64 = render_pool.submit(
+                    render_map_png, slam.map_snapshot(), slam.robot_x, slam.robot_y).result()
+            else:
+                img_b64 = encode_map_png(slam.get_map_image())
         return jsonify({
             'image': img_b64,
             'scan_count': slam.scan_count,
@@ -300,16 +606,35 @@ def map_data():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
+
+
+@app.route('/debug/profile')
+def debug_profile():
+    return Response(metrics.profile_report(request.args.get('reset') == '1'), mimetype='text/plain')
+
+
+@app.route('/health')
+def health():
+    return jsonify(health_report(slam.status))
+
+
 @app.route('/clear_map', methods=['POST'])
 def clear_map():
-    slam.map_data.fill(50)
-    slam.scan_count = 0
-    slam.total_points = 0
+    slam.clear()
     return jsonify({'success': True})
 
 
 def main():
+    global slam, render_pool
     print("🌐 Starting RPLidar Web SLAM server...")
+    slam = SLAMProcess(LIDAR_PORT) if SLAM_PROCESS else RPLidarSLAM(LIDAR_PORT)
+    SLAM_SCANS.set_function(lambda: slam.scan_count)
+    SLAM_POINTS.set_function(lambda: slam.total_points)
+    if RENDER_WORKERS:
+        render_pool = ProcessPoolExecutor(RENDER_WORKERS, mp_context=multiprocessing.get_context('spawn'))
     # Start SLAM
     slam.start()
     # Start web server
@@ -320,8 +645,10 @@ def main():
         pass
     finally:
         slam.stop()
+        if render_pool:
+            render_pool.shutdown(cancel_futures=True)
         print("✅ Shutdown complete")
 
 
-if _name_ == '_main_':
+if __name__ == '__main__':
     main()
\ No newline at end of file